@@ -13,6 +13,7 @@ def go_cmd(cmd, requestor):
         exit = env.get_exit(where)
         move_object(requestor, exit) 
         look_cmd('look', requestor)
+        requestor.send_room_info()
     except KeyError:
         raise CommandError('There is no exit "{}"'.format(where))
 
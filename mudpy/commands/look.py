@@ -8,9 +8,8 @@ def look_cmd(cmd, requestor):
         raise CommandError('Syntax error')
 
     env = requestor.environment
-    longdesc = env.long_description
 
-    requestor.write(longdesc)
+    requestor.write(env.long_description, env.render_cache)
 
 
 register_gameplay_command('look', look_cmd)
@@ -8,6 +8,8 @@ class ConfigGroup: pass
 
 db = ConfigGroup()
 db.path = None
+db.cache_size = 10000 # objects kept loaded, 0 keeps all of them
+db.format = 'yaml' # objects are saved as 'yaml' or 'marshal', both are read
 
 log = ConfigGroup()
 log.level = 'INFO'
@@ -22,6 +24,20 @@ telnet.terminal_type_support = True
 telnet.utf8_support = True
 telnet.window_size_support = True
 telnet.readoptions_sleep_time = 0.5
+# MCCP2 output compression, levels as for zlib
+telnet.compression_support = True
+telnet.compression_level = 6
+# GMCP out of band data for client GUIs (room info etc.)
+telnet.gmcp_support = True
+# What to do with clients which don't read their output: once more than
+# output_limit bytes are waiting 'drop' discards the oldest output and
+# 'disconnect' closes the connection
+telnet.output_policy = 'disconnect'
+telnet.output_limit = 256 << 10
+telnet.output_timeout = 60.0
+# Run commands which arrived together back to back, with one prompt after
+# the last of them
+telnet.pipeline_commands = True
 
 term = ConfigGroup()
 term.color_types = {
@@ -1,9 +1,12 @@
-import copy
+import marshal
 import os
 import os.path
 import re
+import weakref
 import yaml
 
+from collections import OrderedDict
+
 from . import config
 from . import logging
 
@@ -30,6 +33,10 @@ OBJECT_ID_FORMAT = re.compile(r'^(?P<path>[\w./]+)((?P<clone>#)(?P<clone_id>\d+)
 
 
 class Object_ID(yaml.YAMLObject):
+  __slots__ = ('__oid', '__path', '__is_clone', '__clone_id', '__hash',
+               '__weakref__')
+  __interned = weakref.WeakValueDictionary()
+
   yaml_loader = yaml.SafeLoader
   yaml_tag = '!ID'
 
@@ -41,28 +48,68 @@ class Object_ID(yaml.YAMLObject):
   def to_yaml(cls, dumper, data):
     return dumper.represent_scalar('!ID', repr(data))
 
-  def __init__(self, oid):
-    super().__init__()
+  def __new__(cls, oid):
+    # Object IDs are immutable and interned: while one is alive, the same
+    # oid string always gives the same instance
+    if isinstance(oid, Object_ID):
+      return oid
     oid = str(oid)
+    self = cls.__interned.get(oid)
+    if self is not None:
+      return self
     mo = OBJECT_ID_FORMAT.match(oid)
     if not mo:
       raise RuntimeError('Object_ID() invalid id: ' + oid)
-    self.__oid = mo.group(0)
-    self.__oid_split = mo.groupdict()
+    return cls.__intern(mo.group(0), mo.group('path'),
+                        mo.group('clone') is not None, mo.group('clone_id'))
+
+  @classmethod
+  def __intern(cls, oid, path, is_clone, clone_id):
+    self = cls.__interned.get(oid)
+    if self is None:
+      self = super().__new__(cls)
+      self.__oid = oid
+      self.__path = path
+      self.__is_clone = is_clone
+      self.__clone_id = clone_id
+      self.__hash = hash(oid)
+      cls.__interned[oid] = self
+    return self
+
+  def __hash__(self):
+    return self.__hash
+
+  def __eq__(self, other):
+    if self is other:
+      return True
+    if isinstance(other, Object_ID):
+      return self.__oid == other.__oid
+    return NotImplemented
+
+  def __ne__(self, other):
+    res = self.__eq__(other)
+    return res if res is NotImplemented else not res
+
+  def __copy__(self):
+    return self
+
+  def __deepcopy__(self, memo):
+    return self
+
+  def __reduce__(self):
+    return (Object_ID, (self.__oid,))
 
   @property
   def path(self):
-    return self.__oid_split.get('path')
+    return self.__path
 
   @property
   def is_clone(self):
-    if self.__oid_split.get('clone'):
-      return True
-    return False
+    return self.__is_clone
 
   @property
   def clone_id(self):
-    return self.__oid_split.get('clone_id')
+    return self.__clone_id
 
   @property
   def oid(self):
@@ -73,72 +120,277 @@ class Object_ID(yaml.YAMLObject):
       raise RuntimeError(
           'Object_ID: Trying to add clone id to non-clone')
     cid = str(cid)
-    newid = copy.deepcopy(self)
-    newid.__oid_split['clone_id'] = cid
-    newid.__oid = '%s#%s' % (self.oid, cid)
-    return newid
+    if not cid.isdigit():
+      raise RuntimeError('Object_ID() invalid clone id: ' + cid)
+    # no need to parse what is known to be valid
+    return self.__intern('%s#%s' % (self.__path, cid), self.__path, True, cid)
 
   def drop_clone(self):
-    newid = copy.deepcopy(self)
-    newid.__oid_split.pop('clone')
-    newid.__oid_split.pop('clone_id')
-    newid.__oid = newid.oid
-    return newid
+    return Object_ID(self.__path)
 
   def __repr__(self):
     return self.oid
 
 
 class ObjectCache(Borg):
+  '''Keeps loaded objects, at most config.db.cache_size of them.
+
+     The least recently used objects are evicted first, objects that
+     changed are saved then. Pinned objects (online players) and whatever
+     surrounds a pinned object (its environment, the environment's
+     inventory and its own inventory) are never evicted. An evicted object
+     that is still referenced elsewhere is found again instead of being
+     loaded a second time. Objects hold on to their environment, so an
+     evicted room with NPCs or items in it is found again with them. Such
+     an object goes back into the cache when it changes, see changed().
+
+     Clones can't be reloaded, they are kept apart from the other objects
+     until they are destroyed and don't count towards the cache size.'''
+
   __global_clone_id = 0
-  __id_to_obj = dict()
+  __id_to_obj = OrderedDict()
+  __clones = dict()
+  __live = weakref.WeakValueDictionary()
+  __pinned = set()
+  __stats = dict(hits=0, misses=0, evictions=0, writebacks=0)
 
   def clear(self):
     'This should only be called when testing the object cache!'
     self.__id_to_obj.clear()
+    self.__clones.clear()
+    self.__live.clear()
+    self.__pinned.clear()
+    for key in self.__stats:
+      self.__stats[key] = 0
+
+  @property
+  def stats(self):
+    '''Counts of cache hits, misses, evictions, saves on eviction and clones'''
+    return dict(self.__stats, size=len(self.__id_to_obj),
+                clones=len(self.__clones))
+
+  def pin(self, obj):
+    '''Keeps obj and its surroundings in the cache until unpin(obj)'''
+    self.__pinned.add(obj)
+
+  def unpin(self, obj):
+    self.__pinned.discard(obj)
 
   def get(self, oid, create=None, createdict=None):
     '''Loads an object with given oid. create can be the object
        class, if an object should be created if one doesn't exist. '''
     assert(isinstance(oid, Object_ID))
 
+    if oid.is_clone:
+      return self.__clone(oid, create)
+
     obj = self.__id_to_obj.get(oid)
+    if obj is not None:
+      self.__id_to_obj.move_to_end(oid)
+      self.__stats['hits'] += 1
+      return obj
+
+    obj = self.__live.get(oid)
+    if obj is not None:
+      # evicted, but still in use
+      self.__stats['hits'] += 1
+    else:
+      self.__stats['misses'] += 1
+      obj = DB().load(oid, create, createdict)
+
+    # store the obj in the cache
+    self.__id_to_obj[oid] = obj
+    self.__live[oid] = obj
+    self.__evict()
+
+    return obj
 
-    if not obj:
-      if oid.is_clone:
-        if oid.clone_id:
-          # has clone id, but object not in cache. Object has
-          # been destroyed. Raise KeyError
-          raise KeyError("ObjectCache: Object %s doesn't exist" % oid)
-        else:
-          if not create:
-            raise KeyError(
-                'ObjectCache: create flag not set for oid: %s' % oid)
-
-          # request to clone an object
-          base_obj_oid = oid.drop_clone()
-          base_obj = self.get(base_obj_oid, create)
-          self.__global_clone_id += 1
-          oid = oid.add_clone_id(self.__global_clone_id)
-          obj = copy.deepcopy(base_obj)
-          obj.oid = oid
-      else:
-        obj = DB().load(oid, create, createdict)
-
-      # store the obj in the cache
+  def changed(self, obj):
+    '''Called when obj becomes dirty. If it was evicted but is still in
+       use, it is cached again, so that it is saved when it is evicted.'''
+    oid = obj.oid
+    if oid.is_clone or oid in self.__id_to_obj:
+      return
+    if self.__live.get(oid) is obj:
       self.__id_to_obj[oid] = obj
+      self.__evict()
+
+  def __clone(self, oid, create):
+    if oid.clone_id:
+      obj = self.__clones.get(oid)
+      if obj is None:
+        # has clone id, but object not in cache. Object has
+        # been destroyed. Raise KeyError
+        self.__stats['misses'] += 1
+        raise KeyError("ObjectCache: Object %s doesn't exist" % oid)
+      self.__stats['hits'] += 1
+      return obj
+
+    if not create:
+      raise KeyError('ObjectCache: create flag not set for oid: %s' % oid)
 
+    # request to clone an object
+    self.__stats['misses'] += 1
+    base_obj = self.get(oid.drop_clone(), create)
+    self.__global_clone_id += 1
+    oid = oid.add_clone_id(self.__global_clone_id)
+    obj = base_obj.clone(oid)
+    self.__clones[oid] = obj
     return obj
 
+  def __protected(self):
+    protected = set()
+    for obj in self.__pinned:
+      protected.add(id(obj))
+      protected.update(id(item()) for item in obj.inventory)
+      env = obj.environment
+      if env is not None:
+        protected.add(id(env))
+        protected.update(id(item()) for item in env.inventory)
+    return protected
+
+  def __evict(self):
+    cache = self.__id_to_obj
+    size = config.db.cache_size
+    if not size or len(cache) <= size:
+      return
+    protected = self.__protected()
+    # every object is looked at once at most, the ones that have to stay
+    # go to the most recently used end
+    for i in range(len(cache)):
+      if len(cache) <= size:
+        break
+      oid, obj = next(iter(cache.items()))
+      if id(obj) in protected:
+        cache.move_to_end(oid)
+        continue
+      del cache[oid]
+      self.__stats['evictions'] += 1
+      if obj.dirty:
+        logging.debug('ObjectCache: saving evicted {}', oid)
+        obj.save()
+        self.__stats['writebacks'] += 1
+
   def destroy(self, oid):
-    obj = self.__id_to_obj.get(oid)
+    cache = self.__clones if oid.is_clone else self.__id_to_obj
+    obj = cache.get(oid)
 
     if obj:
       try:
         obj.destroy()
       except AttributeError:
         pass
-      self.__id_to_obj.pop(oid)
+      cache.pop(oid)
+      self.__live.pop(oid, None)
+
+
+class Serializer():
+  '''Reads and writes the state of an object in one file format.
+
+     Objects are stored as their class's yaml_tag and the dict returned by
+     their __getstate__(). An object at /path/id is kept in the file
+     path/id plus suffix in the database directory.'''
+
+  suffix = ''
+  binary = False
+
+  def load(self, fd):
+    '''Returns (tag, state) read from fd'''
+    raise NotImplementedError
+
+  def dump(self, tag, state, fd):
+    raise NotImplementedError
+
+
+class YAMLSerializer(Serializer):
+  '''One YAML document per object, as written by hand'''
+
+  def load(self, fd):
+    loader = yaml.SafeLoader(fd)
+    try:
+      node = loader.get_single_node()
+      if not isinstance(node, yaml.MappingNode):
+        raise yaml.constructor.ConstructorError(
+            None, None, 'expected an object', node.start_mark)
+      return node.tag, loader.construct_mapping(node, deep=True)
+    finally:
+      loader.dispose()
+
+  def dump(self, tag, state, fd):
+    dumper = yaml.Dumper(fd, explicit_start=True, width=72, indent=4,
+                         default_flow_style=False)
+    try:
+      dumper.open()
+      dumper.serialize(dumper.represent_mapping(tag, state))
+      dumper.close()
+    finally:
+      dumper.dispose()
+
+
+class MarshalSerializer(Serializer):
+  '''Compact binary format, written with the marshal module.
+
+     marshal knows the builtin types only: Object_IDs are stored as
+     ('!ID', oid) and tuples as ('!tuple', item, ...). Its format may
+     change between Python versions, keep the YAML files or convert back
+     before upgrading.'''
+
+  suffix = '.bin'
+  binary = True
+
+  def load(self, fd):
+    tag, state = marshal.load(fd)
+    return tag, _unpack(state)
+
+  def dump(self, tag, state, fd):
+    marshal.dump((tag, _pack(state)), fd)
+
+
+def _pack(value):
+  cls = type(value)
+  if cls is dict:
+    return {_pack(k): _pack(v) for k, v in value.items()}
+  if cls is list:
+    return [_pack(v) for v in value]
+  if cls is Object_ID:
+    return ('!ID', value.oid)
+  if cls is tuple:
+    return ('!tuple',) + tuple(_pack(v) for v in value)
+  if cls is set or cls is frozenset:
+    return cls(_pack(v) for v in value)
+  return value
+
+def _unpack(value):
+  cls = type(value)
+  if cls is dict:
+    return {_unpack(k): _unpack(v) for k, v in value.items()}
+  if cls is list:
+    return [_unpack(v) for v in value]
+  if cls is tuple:
+    if value[0] == '!ID':
+      return Object_ID(value[1])
+    return tuple(_unpack(v) for v in value[1:])
+  if cls is set or cls is frozenset:
+    return cls(_unpack(v) for v in value)
+  return value
+
+
+# config.db.format names one of these, objects saved in another one are
+# still found
+serializers = OrderedDict([
+    ('yaml', YAMLSerializer()),
+    ('marshal', MarshalSerializer()),
+])
+
+
+def object_class(tag):
+  '''Returns the object class with the given yaml_tag'''
+  # object classes register with the YAML loader, see yaml.YAMLObject
+  constructor = yaml.SafeLoader.yaml_constructors.get(tag)
+  cls = getattr(constructor, '__self__', None)
+  if not isinstance(cls, type):
+    raise RuntimeError('DB: unknown object class: %s' % tag)
+  return cls
 
 
 class DB(Borg):
@@ -149,31 +401,69 @@ class DB(Borg):
     path = os.path.join(config.db.path, path[1:])
     return path
 
+  def __serializers(self):
+    # the configured format first, then the ones to fall back to
+    first = serializers[config.db.format]
+    yield first
+    for serializer in serializers.values():
+      if serializer is not first:
+        yield serializer
+
   def delete_id(self, oid):
     if oid.is_clone:
       raise RuntimeError("DB: Cannot delete clone object: %s" % oid)
-    os.unlink(self.__fix_path(oid))
+    path = self.__fix_path(oid)
+    for serializer in self.__serializers():
+      if os.path.exists(path + serializer.suffix):
+        os.unlink(path + serializer.suffix)
+        return
+    raise DoesNotExist
+
+  def read(self, path, serializer):
+    '''Returns (tag, state) of the object stored in path + suffix'''
+    with open(path + serializer.suffix,
+              'rb' if serializer.binary else 'r') as fd:
+      return serializer.load(fd)
+
+  def write(self, path, serializer, tag, state):
+    '''Stores the object in path + suffix, removing it in other formats'''
+    with open(path + serializer.suffix,
+              'wb' if serializer.binary else 'w') as fd:
+      serializer.dump(tag, state, fd)
+    for other in serializers.values():
+      if other.suffix != serializer.suffix:
+        try:
+          os.unlink(path + other.suffix)
+        except FileNotFoundError:
+          pass
 
   def load(self, oid, create=None, createdict=None):
     '''Loads an object with given oid. create_if_needed can be the object
        class, if an object should be created if one doesn't exist. '''
 
-    try:
-      path = self.__fix_path(oid)
-      logging.debug('DB:load(oid={})', oid, path)
-      with open(path) as fd:
-        obj = yaml.safe_load(fd)
+    path = self.__fix_path(oid)
+    logging.debug('DB:load(oid={})', oid, path)
+    for serializer in self.__serializers():
+      try:
+        tag, state = self.read(path, serializer)
+      except IOError:
+        continue
+      cls = object_class(tag)
+      obj = cls.__new__(cls)
+      obj.__setstate__(state)
+      obj.oid = oid
+      obj._Object__clean()
+      return obj
+
+    if create:
+      if not createdict:
+        createdict = dict()
+      obj = create.__new__(create)
+      obj.__setstate__(createdict)
       obj.oid = oid
+      obj._Object__clean()
       return obj
-    except IOError:
-      if create:
-        if not createdict:
-          createdict = dict()
-        obj = create.__new__(create)
-        obj.__setstate__(createdict)
-        obj.oid = oid
-        return obj
-      raise DoesNotExist
+    raise DoesNotExist
 
   def save_obj(self, obj):
     oid = obj.oid
@@ -183,6 +473,6 @@ class DB(Borg):
     logging.debug('DB:save_obj(oid={}): path={}', oid, path)
     dirname = os.path.dirname(path)
     mkdir(dirname)
-    with open(path, 'w') as fd:
-      yaml.dump(obj, fd, explicit_start=True, width=72, indent=4, default_flow_style=False)
+    self.write(path, serializers[config.db.format], obj.yaml_tag,
+               obj.__getstate__())
 
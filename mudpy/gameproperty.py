@@ -1,7 +1,7 @@
 # Game properties should be registered at import time
 
 class GameProperty:
-    __slots__ = ('__propname', '__default', '__readonly')
+    __slots__ = ('__propname', '__default', '__readonly', '__tmp')
 
     def __init__(self, propname, default=None, readonly=False, tmp=False):
         if not tmp:
@@ -10,6 +10,7 @@ class GameProperty:
             self.__propname = '_TempGameProperty_' + propname
         self.__default  = default
         self.__readonly = readonly
+        self.__tmp      = tmp
 
     def __get__(self, obj, type=None):
         return getattr(obj, self.__propname, self.__default)
@@ -18,6 +19,8 @@ class GameProperty:
         if self.__readonly:
             raise AttributeError("{} is readonly".format(self.__propname))
         obj._Object__propdict[self.__propname] = value
+        if not self.__tmp:
+            obj._Object__changed()
 
     def __delete__(self, obj):
         if self.__readonly:
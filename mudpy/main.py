@@ -2,17 +2,38 @@ import optparse
 import os
 
 from tyderium.hub import Hub
+from tyderium.prefork import prefork
 from tyderium.server import Listener
 from tyderium.timers import start_timer_service
 
 
+def serve(listener):
+    try:
+        with Hub() as hub:
+            start_timer_service(hub)
+            hub.spawn(listener.serve)
+            hub.switch()
+    except KeyboardInterrupt:
+        logging.fatal('MUD Shutdown due to keyboard request')
+    except:
+        logging.exception("MUD Shutdown due to exception!")
+
+
 if __name__ == '__main__':
-    parser = optparse.OptionParser('%prog configfile')
+    parser = optparse.OptionParser('%prog [options] configfile')
+    parser.add_option('-w', '--workers', type='int', default=0,
+        help='serve from a forked worker process which is restarted '
+             'when it dies; only 1 is supported, workers would write the '
+             'same database files')
 
     opt, args = parser.parse_args()
 
     if len(args) != 1:
         parser.error('Expected 1 argument: config file')
+    if opt.workers > 1:
+        # every worker has an object cache of its own, a player logged in
+        # on two of them would be saved by both
+        parser.error('--workers: at most 1 worker is supported')
 
     from . import config
     config.load(args[0])
@@ -23,17 +44,14 @@ if __name__ == '__main__':
     from mudpy import mudlib
 
     try:
-        with Hub() as hub:
-            start_timer_service(hub)
-
-            hub.spawn(
-                Listener(
-                    (config.telnet.bind_address, config.telnet.bind_port),
-                    mudlib.player.new_connection,
-                    pf=config.telnet.address_family).serve)
-            hub.switch()
-    except KeyboardInterrupt:
-        logging.fatal('MUD Shutdown due to keyboard request')
+        listener = Listener(
+            (config.telnet.bind_address, config.telnet.bind_port),
+            mudlib.player.new_connection,
+            pf=config.telnet.address_family)
     except:
         logging.exception("MUD Shutdown due to exception!")
-
+    else:
+        if opt.workers > 0:
+            prefork(opt.workers, serve, listener)
+        else:
+            serve(listener)
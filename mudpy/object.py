@@ -1,10 +1,13 @@
 from mudpy.database import *
 
+import copy
 import types
 import weakref
 
 
 class weakset(set):
+  __slots__ = ('__callback',)
+
   def __init__(self, callback):
     self.__callback = callback
 
@@ -16,10 +19,10 @@ class weakset(set):
     return super().add(obj)
 
   def discard(self, obj):
+    # references compare equal while their objects live, a dead one is
+    # only found as itself, e.g. when it is passed to the callback
     if not isinstance(obj, weakref.ref):
       obj = obj.weakref(self.__callback)
-    else:
-      obj = obj().weakref(self.__callback)
     return super().discard(obj)
 
   def update(self, other_list):
@@ -32,16 +35,20 @@ class weakset(set):
   #TODO auto deref weakrefs on access
 
 
+class _Prototype(dict):
+  '''Game properties of an object to clone, see Object.clone()'''
+  __slots__ = ()
+
+
 class Object():
-  __slots__ = ('__oid', '__environment', '__inventory', '__propdict', '__weakref__')
+  __slots__ = ('__oid', '__environment', '__inventory', '__propdict',
+               '__dirty', '__prototype', '__weakref__')
 
   def __init__(self, oid):
     raise RuntimeError('Mudlib objects cannot be constructed!')
 
   def __de_ref(self, obj):
     self.inventory.discard(obj)
-    if self.environment == obj:
-      self.environment = None # TODO we need better logic here!
 
   def __getattr__(self, attr):
     try:
@@ -61,27 +68,78 @@ class Object():
     return d
 
   def __setstate__(self, newstate):
-    self.__propdict = dict()
-    self.__propdict.update(
-        {'_GameProperty_{}'.format(k): v for k, v in newstate.items()
-         if k != 'environment'})
+    if isinstance(newstate, _Prototype):
+      # containers are copied with whatever they contain, changing one in
+      # place changes this clone only, not the base object or the other
+      # clones. Object_IDs aren't copied, see Object_ID.__deepcopy__()
+      self.__propdict = {
+          k: copy.deepcopy(v) if isinstance(v, (dict, list, set)) else v
+          for k, v in newstate.items()}
+    else:
+      self.__propdict = dict()
+      self.__propdict.update(
+          {'_GameProperty_{}'.format(k): v for k, v in newstate.items()
+           if k != 'environment'})
+    self.__prototype = None
     self.__inventory = weakset(self.__de_ref)
     self.__environment = None
+    # until DB.load() or clone() are done with it, see __clean()
+    self.__dirty = True
 
     if 'environment' in newstate:
       oid = newstate['environment']
       move_object_to_oid(self, oid)
 
+  def __changed(self):
+    self.__set_dirty()
+    self.__prototype = None
+
+  def __set_dirty(self):
+    if not self.__dirty:
+      self.__dirty = True
+      # an evicted object that is still in use goes back into the cache,
+      # to be saved once it is evicted again
+      ObjectCache().changed(self)
+
+  def __clean(self):
+    # called once the subclasses' __setstate__() filled in their defaults,
+    # which doesn't make a freshly loaded object dirty
+    self.__dirty = False
+
+  def clone(self, oid):
+    '''Returns a clone of this object with the given oid.
+
+       The game properties are copied from a snapshot which is kept until
+       this object changes. Dicts, lists and sets are deep-copied for every
+       clone, other values are shared. The clone starts out with an empty
+       inventory, in this object's environment.'''
+    proto = self.__prototype
+    if proto is None:
+      proto = self.__prototype = _Prototype(
+          (k, v) for k, v in self.__propdict.items()
+          if k.startswith('_GameProperty_'))
+    cls = type(self)
+    obj = cls.__new__(cls)
+    obj.__setstate__(proto)
+    obj.oid = oid
+    env = self.environment
+    if env is not None:
+      move_object(obj, env)
+    obj.__clean()
+    return obj
+
   @property
   def environment(self):
-    return self.__environment() if self.__environment else None
+    return self.__environment
 
   @environment.setter
   def environment(self, newenv):
-    if newenv is None or isinstance(newenv, weakref.ref):
-      self.__environment = newenv
-    else:
-      self.__environment = newenv.weakref(self.__de_ref)
+    # held on to, so that the environment (and its inventory) stays
+    # alive as long as something is in it, in the object cache or not
+    if isinstance(newenv, weakref.ref):
+      newenv = newenv()
+    self.__environment = newenv
+    self.__set_dirty()
 
   @property
   def oid(self):
@@ -96,8 +154,14 @@ class Object():
   def inventory(self):
     return self.__inventory    
 
+  @property
+  def dirty(self):
+    '''True if the object changed since it was loaded or saved'''
+    return self.__dirty
+
   def save(self):
       DB().save_obj(self)
+      self.__dirty = False
 
   def weakref(self, callback=None):
     return weakref.ref(self, callback)
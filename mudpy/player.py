@@ -16,8 +16,9 @@ from tyderium.telnet import *
 
 from datetime import datetime
 
+import json
 import socket
-import textwrap
+import weakref
 import yaml
 
 
@@ -102,15 +103,56 @@ class Player(Object, yaml.YAMLObject):
     def check_password(self, password):
         return passwd_tool.compare(self.password, password)
 
-    def write(self, msg):
-        self.__telnet_stream.write(msg)
+    def write(self, msg, cache=None):
+        self.__telnet_stream.write(msg, cache)
+
+    @staticmethod
+    def broadcast(objects, msg):
+        """Writes ``msg`` to every connected player among ``objects``
+
+        ``objects`` can be an inventory, its weak references are followed.
+        """
+        streams = []
+        for obj in objects:
+            if isinstance(obj, weakref.ref):
+                obj = obj()
+            try:
+                ts = obj.__telnet_stream
+            except AttributeError:
+                continue
+            if ts is not None:
+                streams.append(ts)
+        PlayerTelnetStream.broadcast(streams, msg)
 
     def disconnect(self):
         self.__telnet_stream.close()
 
+    def gmcp_send(self, package, data=None):
+        """Pushes GMCP data to the client, only when it changed"""
+        ts = self.__telnet_stream
+        if ts is not None:
+            ts.update_gmcp(package, data)
+
+    def gmcp_received(self, package, data):
+        logging.trace('GMCP {} from {}: {}', package, self.name, data)
+        if package == 'Core.Ping':
+            self.__telnet_stream.send_gmcp('Core.Ping')
+
+    def send_room_info(self):
+        env = self.environment
+        if env is not None:
+            self.gmcp_send('Room.Info', {
+                'num': repr(env.oid),
+                'name': env.short_description,
+                'exits': {direction: repr(oid)
+                          for direction, oid in (env.exits or {}).items()},
+            })
+
     def telnet_attach(self, ts):
+        ObjectCache().pin(self)
         try:
             self.__telnet_stream = ts
+            ts.gmcp_handler = self.gmcp_received
 
             if (self.color == 'auto' and has_color(ts.options.term)) or \
                     self.color == 'on':
@@ -124,19 +166,28 @@ class Player(Object, yaml.YAMLObject):
             self.last_time = datetime.now().ctime()
 
             command('look', self)
+            self.send_room_info()
 
             while True:
-                cmd = ts.prompt('> ').strip().lower()
-      
-                if cmd == '':
-                    continue
-                else:
-                    try:
-                        command(cmd, self)
-                    except CommandError as e:
-                        ts.write(str(e))
+                self.__run_command(ts.prompt('> '))
+                if config.telnet.pipeline_commands:
+                    # lines already received are run without prompting, their
+                    # output goes out in one flush before the next prompt
+                    while ts.line_buffered():
+                        self.__run_command(ts.readline().rstrip())
         except (ConnectionClosed, socket.error):
             self.__telnet_stream = None
+        finally:
+            ObjectCache().unpin(self)
+
+
+    def __run_command(self, cmd):
+        cmd = cmd.strip().lower()
+        if cmd:
+            try:
+                command(cmd, self)
+            except CommandError as e:
+                self.__telnet_stream.write(str(e))
 
 
 def new_connection(conn, addr):
@@ -166,15 +217,35 @@ def new_connection(conn, addr):
 class PlayerTelnetStream(TelnetStream):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        
+
+        self.output_policy = config.telnet.output_policy
+        self.output_limit = config.telnet.output_limit
+        self.output_timeout = config.telnet.output_timeout
+        self.compress_level = config.telnet.compression_level
+
         if config.telnet.terminal_type_support:
             self.request_terminal_type()
         if config.telnet.utf8_support:
             self.enable_binary_mode()
         if config.telnet.window_size_support:
             self.request_window_size()
+        if config.telnet.compression_support:
+            self.request_compression()
+        if config.telnet.gmcp_support:
+            self.request_gmcp()
 
         self.colormap = ansi.DEFAULT_MAP
+        self.__gmcp_sent = {}
+
+    def update_gmcp(self, package, data):
+        """Sends a GMCP message unless it's what was last sent for
+        ``package``"""
+        if not self.gmcp:
+            return
+        encoded = json.dumps(data, sort_keys=True)
+        if self.__gmcp_sent.get(package) != encoded:
+            self.__gmcp_sent[package] = encoded
+            self.send_gmcp(package, data)
 
     def prompt(self, msg):
         while True:
@@ -184,12 +255,63 @@ class PlayerTelnetStream(TelnetStream):
             except Interrupt:
                 self.sendtext('\n')
 
-    def write(self, msg):
-        # textwrap ignoring ESC sequences
+    # broadcast() output reused for another stream / rendered anew
+    broadcast_hits = 0
+    broadcast_misses = 0
+
+    def write(self, msg, cache=None):
+        """Renders and sends ``msg``
+
+        ``cache`` is a dict kept by the caller for a message sent over and
+        over, it then holds one rendering per ``render_key``. A rendering of
+        a different message is replaced.
+        """
+        if cache is None:
+            self.send(self.render(msg))
+            return
+        key = self.render_key
+        try:
+            colormap, text, buf = cache[key]
+            if colormap is self.colormap and text == msg:
+                self.send(buf)
+                return
+        except KeyError:
+            pass
+        buf = self.render(msg)
+        cache[key] = (self.colormap, msg, buf)
+        self.send(buf)
+
+    @property
+    def render_key(self):
+        """Streams with equal keys render a message to the same bytes"""
+        return (id(self.colormap), self.options.window_size[0],
+                self.output_binary)
+
+    def render(self, msg):
+        """Returns the bytes ``write(msg)`` sends"""
         msg = ansi.map_string(msg, self.colormap) 
-        msg = textwrap.fill(msg, width=self.options.window_size[0])
+        msg = ansi.fill(msg, width=self.options.window_size[0])
         msg += '\n'
-        self.sendtext(msg)
+        return self.encodetext(msg)
+
+    @classmethod
+    def broadcast(cls, streams, msg):
+        """Writes ``msg`` to all ``streams``
+
+        The message is rendered once for every distinct colormap, window
+        width and binary mode among the streams. MCCP compression still
+        happens per stream, a deflate stream can't be shared.
+        """
+        rendered = {}
+        for ts in streams:
+            key = ts.render_key
+            try:
+                buf = rendered[key]
+                cls.broadcast_hits += 1
+            except KeyError:
+                buf = rendered[key] = ts.render(msg)
+                cls.broadcast_misses += 1
+            ts.send(buf)
 
 
 
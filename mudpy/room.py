@@ -15,6 +15,9 @@ class Room(Object, yaml.YAMLObject):
     def __setstate__(self, newstate):
         super().__setstate__(newstate)
         self.cached_exits = dict()
+        # long_description as rendered for players, see
+        # PlayerTelnetStream.write()
+        self.render_cache = dict()
         if not self.exits:
             self.exits = dict()
 
@@ -37,3 +40,4 @@ add_gameproperty(Room, 'short_description', readonly=True)
 add_gameproperty(Room, 'long_description', readonly=True)
 add_gameproperty(Room, 'exits')
 add_gameproperty(Room, 'cached_exits', tmp=True)
+add_gameproperty(Room, 'render_cache', tmp=True)
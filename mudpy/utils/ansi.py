@@ -1,5 +1,8 @@
+from functools import lru_cache
 from string import Template
 
+import re
+
 """
 This module defines the ANSI terminal codes and support functions
 """
@@ -61,11 +64,68 @@ DEFAULT_MAP = dict([(x, '')
 del current_locals
 
 
+MAP_CACHE_SIZE = 1024 #: Number of distinct strings map_string() keeps compiled
+
+
+class _CompiledString:
+  """
+  A templatized string split into literal text and template variables,
+  with its renderings for the maps it was used with.
+  """
+  __slots__ = ('literals', 'names', 'renders')
+
+  def __init__(self, s):
+    # literals[i] is followed by names[i], the last literal ends the string
+    self.literals = []
+    self.names = []
+    self.renders = {}
+    literal = []
+    pos = 0
+    for mo in Template.pattern.finditer(s):
+      name = mo.group('named') or mo.group('braced')
+      if name is not None:
+        literal.append(s[pos:mo.start()])
+        self.literals.append(''.join(literal))
+        self.names.append((name, mo.group()))
+        literal = []
+      elif mo.group('escaped') is not None:
+        literal.append(s[pos:mo.start()])
+        literal.append('$')
+      else: # invalid placeholder, kept like safe_substitute() does
+        continue
+      pos = mo.end()
+    literal.append(s[pos:])
+    self.literals.append(''.join(literal))
+
+  def render(self, map):
+    try:
+      rendered_map, res = self.renders[id(map)]
+      if rendered_map is map:
+        return res
+    except KeyError:
+      pass
+    parts = []
+    for literal, (name, text) in zip(self.literals, self.names):
+      parts.append(literal)
+      parts.append(map.get(name, text))
+    parts.append(self.literals[-1])
+    res = ''.join(parts)
+    # the map is kept so that its id() can't be reused by another one
+    self.renders[id(map)] = (map, res)
+    return res
+
+
+_compile = lru_cache(maxsize=MAP_CACHE_SIZE)(_CompiledString)
+
+
 def map_string(s, map = DEFAULT_MAP):
   """
   Coverts a templatized string to a string with the template parameters
   replaced by ANSI codes.
 
+  Results are cached per string and map, maps must not be changed once
+  used.
+
   @type  s: string
   @param s: Templatized string (see string.Template). Template variables
             are from the set of ANSI codes in this module.
@@ -80,8 +140,119 @@ def map_string(s, map = DEFAULT_MAP):
            map
   """
 
-  t = Template(s)
-  return t.safe_substitute(map)
+  if '$' not in s:
+    return s
+  return _compile(s).render(map)
+
+
+WRAP_CACHE_SIZE = 1024 #: Number of (string, width) pairs fill() keeps
+
+_ESCAPE_RE = re.compile(ESC + r'\[[0-9;]*[A-Za-z]')
+_SPACES_RE = re.compile(r'( +)')
+_WHITESPACE_TO_SPACE = str.maketrans('\t\n\x0b\x0c\r', '     ')
+
+
+def _visible_len(chunk):
+  if ESC not in chunk:
+    return len(chunk)
+  return len(_ESCAPE_RE.sub('', chunk))
+
+
+def _split_visible(chunk, n):
+  """Splits chunk after n visible characters"""
+  pos = 0
+  if ESC in chunk:
+    for mo in _ESCAPE_RE.finditer(chunk):
+      text = mo.start() - pos
+      if n <= text:
+        break
+      n -= text
+      pos = mo.end()
+  return chunk[:pos + n], chunk[pos + n:]
+
+
+def _chunks(s):
+  """Splits s into words and runs of spaces, as if escapes weren't there"""
+  chunks = []
+  escapes = '' # escape-only chunks, they go with the next word
+  for chunk in _SPACES_RE.split(s):
+    if not chunk:
+      continue
+    if chunk[0] == ' ':
+      if chunks and chunks[-1][0] == ' ':
+        # the spaces were only separated by escapes
+        chunks[-1] += chunk
+      else:
+        chunks.append(chunk)
+    elif ESC in chunk and not _visible_len(chunk):
+      escapes += chunk
+    else:
+      chunks.append(escapes + chunk)
+      escapes = ''
+  if escapes:
+    # trailing escapes end the last word
+    for i in range(len(chunks) - 1, -1, -1):
+      if chunks[i][0] != ' ':
+        chunks[i] += escapes
+        break
+    else:
+      chunks = [escapes]
+  return chunks
+
+
+@lru_cache(maxsize=WRAP_CACHE_SIZE)
+def fill(s, width=70):
+  """
+  Wraps a string to lines of at most width characters, ANSI escape
+  sequences take no room.
+
+  Works like textwrap.fill() with break_on_hyphens=False: whitespace
+  becomes spaces, lines are filled greedily, whitespace is dropped
+  around line breaks and words longer than width are broken up. Results
+  are cached per string and width.
+
+  @type  s: string
+  @param s: String with ANSI codes already mapped (see map_string)
+  @type  width: int
+  @param width: Maximum visible line length
+
+  @rtype:  string
+  @return: Lines joined with newlines
+  """
+
+  if width <= 0:
+    raise ValueError('invalid width %r (must be > 0)' % (width,))
+  chunks = _chunks(s.expandtabs().translate(_WHITESPACE_TO_SPACE))
+  chunks.reverse()
+  lines = []
+
+  while chunks:
+    cur_line = []
+    cur_len = 0
+
+    # no whitespace at the start of a line, save for the first one
+    if lines and not chunks[-1].strip():
+      del chunks[-1]
+
+    while chunks:
+      l = _visible_len(chunks[-1])
+      if cur_len + l > width:
+        break
+      cur_line.append(chunks.pop())
+      cur_len += l
+
+    # a word too long for a line of its own gets broken up
+    if chunks and _visible_len(chunks[-1]) > width:
+      head, chunks[-1] = _split_visible(chunks[-1], width - cur_len)
+      cur_line.append(head)
+
+    if cur_line and not cur_line[-1].strip():
+      del cur_line[-1]
+
+    if cur_line:
+      lines.append(''.join(cur_line))
+
+  return '\n'.join(lines)
 
 
 if __name__ == '__main__':
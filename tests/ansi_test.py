@@ -0,0 +1,96 @@
+from mudpy.utils import ansi
+
+from string import Template
+
+import random
+import textwrap
+import unittest
+
+
+_ESCAPE_RE = ansi._ESCAPE_RE
+
+
+class Map_string_TestCase(unittest.TestCase):
+  def test_matches_safe_substitute(self):
+    '''Tests that map_string() renders like Template.safe_substitute()'''
+
+    strings = ['no markup', '${RED}red${RESET}', '$RED$$RESET', '$$RED',
+               '${UNKNOWN} $UNKNOWN', '$ 1 ${', '${BG_WHITE}${BLACK}x$',
+               '']
+    for s in strings:
+      for map in (ansi.ANSI_MAP, ansi.DEFAULT_MAP, {}):
+        self.assertEqual(ansi.map_string(s, map),
+                         Template(s).safe_substitute(map))
+
+  def test_renders_per_map(self):
+    '''Tests that a cached string is rendered anew for another map'''
+
+    s = '${GREEN}cached${DEFAULT}'
+    self.assertEqual(ansi.map_string(s), 'cached')
+    self.assertEqual(ansi.map_string(s, ansi.ANSI_MAP),
+                     ansi.GREEN + 'cached' + ansi.DEFAULT)
+    self.assertEqual(ansi.map_string(s, {'GREEN': '<', 'DEFAULT': '>'}),
+                     '<cached>')
+    self.assertEqual(ansi.map_string(s), 'cached')
+
+
+class Fill_TestCase(unittest.TestCase):
+  def test_plain_matches_textwrap(self):
+    '''Tests that text without escapes is wrapped like textwrap.fill()'''
+
+    text = ('A dusty rug covers most of the floor,\nand a single torch '
+            'flickers   in its iron sconce. ' + 'x' * 30 + ' end')
+    for width in (1, 5, 10, 20, 80):
+      self.assertEqual(ansi.fill(text, width),
+                       textwrap.fill(text, width, break_on_hyphens=False))
+
+  def test_escapes_take_no_room(self):
+    '''Tests that escape sequences don't count towards the width'''
+
+    text = ansi.map_string('${RED}red${DEFAULT} ${GREEN}green${DEFAULT}',
+                           ansi.ANSI_MAP)
+    self.assertEqual(ansi.fill(text, 9), text)
+    self.assertEqual(ansi.fill(text, 8),
+                     ansi.RED + 'red' + ansi.DEFAULT + '\n' +
+                     ansi.GREEN + 'green' + ansi.DEFAULT)
+
+  def test_long_word_split_between_escapes(self):
+    '''Tests that breaking up a long word never cuts an escape sequence'''
+
+    text = 'ab' + ansi.RED + 'cd' + ansi.DEFAULT + 'ef'
+    self.assertEqual(ansi.fill(text, 2).split('\n'),
+                     ['ab', ansi.RED + 'cd', ansi.DEFAULT + 'ef'])
+
+  def test_escapes_between_spaces(self):
+    '''Tests that escapes between spaces go with the next word'''
+
+    text = ansi.map_string('You see a ${RED} red door', ansi.ANSI_MAP)
+    self.assertEqual(ansi.fill(text, 9).split('\n'),
+                     ['You see a', ansi.RED + 'red door'])
+    self.assertEqual(ansi.fill(text, 30),
+                     'You see a  ' + ansi.RED + 'red door')
+
+  def test_trailing_escapes(self):
+    '''Tests that escapes at the end don't make a line of their own'''
+
+    text = ansi.map_string('a door ${DEFAULT}', ansi.ANSI_MAP)
+    self.assertEqual(ansi.fill(text, 4), 'a\ndoor' + ansi.DEFAULT)
+    self.assertEqual(ansi.fill(ansi.RED, 4), ansi.RED)
+
+  def test_colored_matches_textwrap(self):
+    '''Tests that colored text wraps like the text without colors'''
+
+    words = ['a', 'bb', 'word', 'x' * 15, ' ', '  ', '\n', ansi.RED,
+             ansi.DEFAULT]
+    rnd = random.Random(1)
+    for i in range(2000):
+      text = ''.join(rnd.choice(words) for j in range(rnd.randint(0, 20)))
+      width = rnd.randint(1, 20)
+      res = ansi.fill(text, width)
+      self.assertEqual(_ESCAPE_RE.sub('', res), textwrap.fill(
+          _ESCAPE_RE.sub('', text), width, break_on_hyphens=False))
+      self.assertEqual(_ESCAPE_RE.findall(res), _ESCAPE_RE.findall(text))
+
+
+if __name__ == '__main__':
+  unittest.main()
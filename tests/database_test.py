@@ -0,0 +1,280 @@
+from mudpy import config
+from mudpy.database import *
+from mudpy import room
+
+import gc
+import os
+import shutil
+import tempfile
+import unittest
+
+
+ROOM = '''--- !Room
+short_description: Room {0}
+long_description: This is room {0}.
+exits:
+    north: !ID /rooms/r{1}
+'''
+
+
+class ObjectCache_TestCase(unittest.TestCase):
+  def setUp(self):
+    self.path = tempfile.mkdtemp()
+    os.mkdir(os.path.join(self.path, 'rooms'))
+    for i in range(4):
+      with open(os.path.join(self.path, 'rooms', 'r%d' % i), 'w') as fd:
+        fd.write(ROOM.format(i, (i + 1) % 4))
+    self.old_config = config.db.path, config.db.cache_size, config.db.format
+    config.db.path = self.path
+    config.db.cache_size = 2
+    self.oids = [Object_ID('/rooms/r%d' % i) for i in range(4)]
+    ObjectCache().clear()
+
+  def tearDown(self):
+    ObjectCache().clear()
+    config.db.path, config.db.cache_size, config.db.format = self.old_config
+    shutil.rmtree(self.path)
+
+  def test_evicts_least_recently_used(self):
+    '''Tests that the cache keeps the most recently used objects'''
+
+    cache = ObjectCache()
+    cache.get(self.oids[0])
+    cache.get(self.oids[1])
+    cache.get(self.oids[0])
+    cache.get(self.oids[2])
+    stats = cache.stats
+    self.assertEqual(stats['size'], 2)
+    self.assertEqual(stats['misses'], 3)
+    self.assertEqual(stats['hits'], 1)
+    self.assertEqual(stats['evictions'], 1)
+    self.assertEqual(stats['writebacks'], 0)
+
+  def test_dirty_objects_saved_on_eviction(self):
+    '''Tests that a changed object is written back when it is evicted'''
+
+    cache = ObjectCache()
+    obj = cache.get(self.oids[0])
+    self.assertFalse(obj.dirty)
+    obj.exits = {'up': self.oids[3]}
+    self.assertTrue(obj.dirty)
+    del obj
+    cache.get(self.oids[1])
+    cache.get(self.oids[2])
+    self.assertEqual(cache.stats['writebacks'], 1)
+    saved = DB().load(self.oids[0])
+    self.assertEqual(repr(saved.exits['up']), '/rooms/r3')
+
+  def test_loaded_objects_clean(self):
+    '''Tests that defaults set while loading don't make an object dirty'''
+
+    text = '# a comment\n' + ROOM.split('exits')[0].format(0) + 'exits: {}\n'
+    with open(os.path.join(self.path, 'rooms', 'r0'), 'w') as fd:
+      fd.write(text)
+    config.db.format = 'marshal'
+    cache = ObjectCache()
+    obj = cache.get(self.oids[0])
+    self.assertEqual(obj.exits, {})
+    self.assertFalse(obj.dirty)
+    self.assertFalse(cache.get(Object_ID('/rooms/r0#'), room.Room).dirty)
+    self.assertFalse(cache.get(Object_ID('/rooms/new'), room.Room).dirty)
+    del obj
+    for oid in self.oids[1:]:
+      cache.get(oid)
+    self.assertEqual(cache.stats['writebacks'], 0)
+    with open(os.path.join(self.path, 'rooms', 'r0')) as fd:
+      self.assertEqual(fd.read(), text)
+
+  def test_pinned_objects_stay(self):
+    '''Tests that pinned objects are not evicted'''
+
+    cache = ObjectCache()
+    pinned = cache.get(self.oids[0])
+    cache.pin(pinned)
+    for oid in self.oids[1:]:
+      cache.get(oid)
+    self.assertIs(cache.get(self.oids[0]), pinned)
+    self.assertEqual(cache.stats['misses'], 4)
+    cache.unpin(pinned)
+
+  def test_repeated_get_loads_once(self):
+    '''Tests that getting an object by a new ID doesn't reload it'''
+
+    config.db.cache_size = 0
+    cache = ObjectCache()
+    obj = cache.get(Object_ID('/rooms/r0'))
+    for i in range(10):
+      self.assertIs(cache.get(Object_ID('/rooms/r0')), obj)
+    self.assertEqual(cache.stats['misses'], 1)
+    self.assertEqual(cache.stats['hits'], 10)
+
+  def test_evicted_room_keeps_contents(self):
+    '''Tests that evicting a room doesn't take it away from its contents'''
+
+    cache = ObjectCache()
+    env = cache.get(self.oids[0])
+    guard = cache.get(Object_ID('/npcs/guard'), room.Room,
+                      {'short_description': 'Guard',
+                       'environment': self.oids[0]})
+    clone = cache.get(Object_ID('/npcs/guard#'), room.Room)
+    self.assertIs(clone.environment, env)
+    del env, guard
+    for oid in self.oids[1:]:
+      cache.get(oid)
+    self.assertEqual(cache.stats['evictions'], 3)
+    gc.collect()
+
+    env = clone.environment
+    self.assertIs(cache.get(self.oids[0]), env)
+    # the evicted guard is gone, the clone is still there
+    self.assertEqual([item() for item in env.inventory], [clone])
+
+  def test_changed_after_eviction_saved(self):
+    '''Tests that an evicted object still in use is saved after changes'''
+
+    cache = ObjectCache()
+    cache.get(self.oids[0])
+    cache.get(Object_ID('/npcs/guard'), room.Room,
+              {'short_description': 'Guard', 'environment': self.oids[0]})
+    clone = cache.get(Object_ID('/npcs/guard#'), room.Room)
+    for oid in self.oids[1:]:
+      cache.get(oid)
+    gc.collect()
+    env = clone.environment
+    self.assertFalse(env.dirty)
+    env.exits = {'up': self.oids[3]}
+    self.assertTrue(env.dirty)
+    del env
+    for oid in self.oids[1:]:
+      cache.get(oid)
+    self.assertEqual(cache.stats['writebacks'], 1)
+    self.assertFalse(clone.environment.dirty)
+
+    del clone
+    gc.collect()
+    saved = DB().load(self.oids[0])
+    self.assertIs(saved.exits['up'], self.oids[3])
+
+  def test_clones(self):
+    '''Tests that clones copy the base object's properties and stay cached'''
+
+    cache = ObjectCache()
+    base = cache.get(self.oids[0])
+    clones = [cache.get(Object_ID('/rooms/r0#'), room.Room)
+              for i in range(4)]
+    self.assertEqual(len(set(clone.oid for clone in clones)), 4)
+    clone = clones[0]
+    self.assertTrue(clone.oid.is_clone)
+    self.assertIsInstance(clone, room.Room)
+    self.assertEqual(clone.short_description, 'Room 0')
+    self.assertEqual(clone.exits, base.exits)
+    self.assertIsNot(clone.exits, base.exits)
+    self.assertIs(clone.short_description, base.short_description)
+    self.assertIsNot(clone.cached_exits, base.cached_exits)
+    self.assertEqual(len(clone.inventory), 0)
+
+    clone.exits['up'] = self.oids[2]
+    clone.exits.pop('north')
+    self.assertEqual(list(base.exits), ['north'])
+    self.assertEqual(list(clones[1].exits), ['north'])
+    self.assertIs(clones[1].exits['north'], base.exits['north'])
+    clone.exits = {}
+    self.assertEqual(list(base.exits), ['north'])
+    self.assertFalse(base.dirty)
+    base.exits = {'up': self.oids[3]}
+    self.assertEqual(list(cache.get(Object_ID('/rooms/r0#'), room.Room).exits),
+                     ['up'])
+
+    stats = cache.stats
+    self.assertEqual(stats['clones'], 5)
+    self.assertEqual(stats['size'], 1)
+    self.assertIs(cache.get(clone.oid), clone)
+    cache.destroy(clone.oid)
+    self.assertRaises(KeyError, cache.get, clone.oid)
+
+
+  def test_clones_nested_containers(self):
+    '''Tests that changing a nested container changes one clone only'''
+
+    cache = ObjectCache()
+    base = cache.get(self.oids[0])
+    base.exits = {'north': self.oids[1], 'list': [[1]], 'set': {(1, 2)}}
+    base.save()
+    clones = [cache.get(Object_ID('/rooms/r0#'), room.Room)
+              for i in range(2)]
+    clones[0].exits['list'][0].append(2)
+    clones[0].exits['set'].add(3)
+    for obj in (base, clones[1]):
+      self.assertEqual(obj.exits['list'], [[1]])
+      self.assertEqual(obj.exits['set'], {(1, 2)})
+    self.assertFalse(base.dirty)
+    self.assertEqual(cache.get(Object_ID('/rooms/r0#'), room.Room).exits,
+                     {'north': self.oids[1], 'list': [[1]], 'set': {(1, 2)}})
+
+
+class DB_TestCase(unittest.TestCase):
+  def setUp(self):
+    self.path = tempfile.mkdtemp()
+    os.mkdir(os.path.join(self.path, 'rooms'))
+    self.room_path = os.path.join(self.path, 'rooms', 'r0')
+    with open(self.room_path, 'w') as fd:
+      fd.write(ROOM.format(0, 1))
+    self.old_config = config.db.path, config.db.format
+    config.db.path = self.path
+    self.oid = Object_ID('/rooms/r0')
+
+  def tearDown(self):
+    config.db.path, config.db.format = self.old_config
+    shutil.rmtree(self.path)
+
+  def test_marshal_format(self):
+    '''Tests saving in the binary format and falling back to YAML'''
+
+    config.db.format = 'marshal'
+    obj = DB().load(self.oid)
+    self.assertEqual(obj.short_description, 'Room 0')
+    obj.exits['up'] = (self.oid, 'and', ('back',))
+    obj.save()
+    self.assertFalse(os.path.exists(self.room_path))
+    self.assertTrue(os.path.exists(self.room_path + '.bin'))
+
+    config.db.format = 'yaml'
+    saved = DB().load(self.oid)
+    self.assertIsInstance(saved, room.Room)
+    self.assertEqual(saved.long_description, 'This is room 0.')
+    self.assertEqual(saved.exits, obj.exits)
+    self.assertIs(saved.exits['north'], Object_ID('/rooms/r1'))
+    saved.save()
+    self.assertTrue(os.path.exists(self.room_path))
+    self.assertFalse(os.path.exists(self.room_path + '.bin'))
+
+    DB().delete_id(self.oid)
+    self.assertRaises(DoesNotExist, DB().load, self.oid)
+
+
+class Object_ID_TestCase(unittest.TestCase):
+  def test_value_equality(self):
+    '''Tests that IDs compare and hash by their oid string'''
+
+    oid = Object_ID('/rooms/r0')
+    self.assertEqual(oid, Object_ID('/rooms/r0'))
+    self.assertNotEqual(oid, Object_ID('/rooms/r1'))
+    self.assertNotEqual(oid, '/rooms/r0')
+    self.assertEqual(hash(oid), hash('/rooms/r0'))
+    self.assertEqual({oid: 1}.get(Object_ID('/rooms/r0')), 1)
+
+  def test_clone_ids(self):
+    '''Tests adding and dropping clone ids'''
+
+    oid = Object_ID('/npc/orc#')
+    self.assertTrue(oid.is_clone)
+    self.assertIsNone(oid.clone_id)
+    clone = oid.add_clone_id(7)
+    self.assertEqual(clone, Object_ID('/npc/orc#7'))
+    self.assertEqual(clone.clone_id, '7')
+    self.assertEqual(clone.drop_clone(), Object_ID('/npc/orc'))
+    self.assertFalse(clone.drop_clone().is_clone)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,52 @@
+from greenlet import getcurrent
+from tyderium import lib
+from tyderium import timers
+from tyderium.hub import Hub
+
+import unittest
+
+
+class Hub_TestCase(unittest.TestCase):
+  def test_cancel_pending_timer(self):
+    '''Tests that a timer cancelled after it fired is not dispatched'''
+
+    fired = []
+
+    def first():
+      fired.append(1)
+      second.cancel()
+
+    with Hub(default_signals=False) as hub:
+      timers.start_timer_service(hub)
+      timers.Timer(first, 0.01)
+      second = timers.Timer(lambda: fired.append(2), 0.01)
+      timers.Timer(timers.stop_timer_service, 0.05)
+      hub.switch()
+    self.assertEqual(fired, [1])
+
+  def test_discard_pending_multi_watch(self):
+    '''Tests that a discarded multi watch is not dispatched'''
+
+    fired = []
+    watches = [lib.Timer(0.01), lib.Timer(0.01)]
+
+    def wait():
+      for i, watch in enumerate(watches):
+        watch.branch = getcurrent()
+        hub.add_watch(watch, i, single=False)
+      fired.append(hub.switch())
+      for watch in watches:
+        hub.discard_watch(watch)
+      later = lib.Timer(0.05)
+      later.branch = getcurrent()
+      hub.add_watch(later, 'later')
+      fired.append(hub.switch())
+
+    with Hub(default_signals=False) as hub:
+      hub.spawn(wait)
+      hub.switch()
+    self.assertEqual(fired, [0, 'later'])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,72 @@
+from mudpy import config
+from mudpy.database import *
+from mudpy.player import Player, PlayerTelnetStream
+from mudpy import room
+
+from tyderium import socket
+
+import os
+import shutil
+import socket as stdsocket
+import tempfile
+import unittest
+
+
+ROOM = '''--- !Room
+short_description: Room
+long_description: This is a room.
+exits: {}
+'''
+
+
+class Broadcast_TestCase(unittest.TestCase):
+  def setUp(self):
+    self.path = tempfile.mkdtemp()
+    os.mkdir(os.path.join(self.path, 'rooms'))
+    with open(os.path.join(self.path, 'rooms', 'r0'), 'w') as fd:
+      fd.write(ROOM)
+    self.old_path = config.db.path
+    config.db.path = self.path
+    ObjectCache().clear()
+    self.sockets = []
+
+  def tearDown(self):
+    for sock in self.sockets:
+      sock.close()
+    ObjectCache().clear()
+    config.db.path = self.old_path
+    shutil.rmtree(self.path)
+
+  def player(self, name, connected=True):
+    obj = DB().load(Object_ID('/players/%s/player' % name), Player,
+                    {'name': name, 'environment': Object_ID('/rooms/r0')})
+    if connected:
+      a, b = stdsocket.socketpair()
+      a = socket.socket(fileno=a.detach())
+      self.sockets += [a, b]
+      obj._Player__telnet_stream = PlayerTelnetStream(a)
+    return obj
+
+  def test_room_inventory(self):
+    '''Tests broadcasting to an inventory, sharing renderings'''
+
+    players = [self.player('alice'), self.player('bob'),
+               self.player('carol'), self.player('dave', connected=False)]
+    streams = [p._Player__telnet_stream for p in players[:3]]
+    streams[2].options.window_size = (40, 24)
+    env = ObjectCache().get(Object_ID('/rooms/r0'))
+    self.assertEqual(len(env.inventory), 4)
+
+    before = [ts.output_stats.queued for ts in streams]
+    hits = PlayerTelnetStream.broadcast_hits
+    misses = PlayerTelnetStream.broadcast_misses
+    msg = 'A bell rings somewhere far away. ' * 3
+    Player.broadcast(env.inventory, msg)
+    for ts, queued in zip(streams, before):
+      self.assertEqual(ts.output_stats.queued - queued, len(ts.render(msg)))
+    self.assertEqual(PlayerTelnetStream.broadcast_hits - hits, 1)
+    self.assertEqual(PlayerTelnetStream.broadcast_misses - misses, 2)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,94 @@
+from tyderium.stream import InputStream, LineTooLong, ConnectionClosed
+
+import unittest
+
+
+class Source(object):
+  '''Serves data at most chunk bytes per call'''
+
+  def __init__(self, data, chunk):
+    self.data = data
+    self.chunk = chunk
+    self.pos = 0
+
+  def recv(self, size):
+    size = min(size, self.chunk)
+    res = self.data[self.pos:self.pos + size]
+    self.pos += len(res)
+    return res
+
+
+class IntoSource(Source):
+  def recv_into(self, buffer, nbytes=0):
+    res = self.recv(nbytes or len(buffer))
+    buffer[:len(res)] = res
+    return len(res)
+
+
+class InputStream_TestCase(unittest.TestCase):
+  def streams(self, data):
+    '''Yields streams on data with and without recv_into, chunk sizes from
+       one byte to more than the buffer size'''
+    for cls in (Source, IntoSource):
+      for chunk in (1, 7, InputStream.buffer_size * 3):
+        yield InputStream(cls(data, chunk))
+
+  def test_readline_across_compactions(self):
+    '''Tests reading more lines than fit in the buffer'''
+
+    lines = [('%d ' % i).encode() * (i % 50) + b'\n' for i in range(2000)]
+    for stream in self.streams(b''.join(lines)):
+      for line in lines:
+        self.assertEqual(stream.readline(), line)
+      self.assertRaises(ConnectionClosed, stream.readline)
+
+  def test_readline_long_line(self):
+    '''Tests lines longer than the buffer and multi-byte line ends'''
+
+    line = b'x' * (InputStream.buffer_size * 4) + b'\r\n\r\n'
+    for stream in self.streams(line + b'tail\r\n\r\n'):
+      self.assertEqual(stream.readline(b'\r\n\r\n', len(line) + 1), line)
+      self.assertEqual(stream.readline(b'\r\n\r\n'), b'tail\r\n\r\n')
+
+  def test_line_too_long(self):
+    '''Tests that buffering more than maxlen raises LineTooLong'''
+
+    size = InputStream.buffer_size
+    for stream in self.streams(b'x' * (size * 4) + b'\n'):
+      self.assertRaises(LineTooLong, stream.readline, b'\n', size)
+
+  def test_half_line(self):
+    '''Tests that a connection closed on a half line raises'''
+
+    for stream in self.streams(b'one\ntwo'):
+      self.assertEqual(stream.readline(), b'one\n')
+      self.assertRaises(ConnectionClosed, stream.readline)
+
+  def test_readblock_read_interleaved(self):
+    '''Tests mixing readline, readblock and read'''
+
+    big = bytes(range(256)) * (InputStream.buffer_size // 64)
+    data = b'head\n' + b'12345' + big + b'line\n' + b'rest'
+    for stream in self.streams(data):
+      self.assertEqual(stream.readline(), b'head\n')
+      self.assertEqual(bytes(stream.readblock(5)), b'12345')
+      self.assertEqual(bytes(stream.readblock(len(big))), big)
+      self.assertEqual(stream.readline(), b'line\n')
+      rest = b''
+      while len(rest) < 4:
+        chunk = stream.read(4 - len(rest))
+        self.assertTrue(chunk)
+        rest += chunk
+      self.assertEqual(rest, b'rest')
+      self.assertEqual(stream.read(10), b'')
+
+  def test_readblock_closed(self):
+    '''Tests that a short block raises ConnectionClosed'''
+
+    for size in (10, InputStream.buffer_size * 2):
+      for stream in self.streams(b'x' * (size - 1)):
+        self.assertRaises(ConnectionClosed, stream.readblock, size)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,230 @@
+from tyderium import socket
+from tyderium.hub import Hub
+from tyderium.telnet import *
+from tyderium.telnet import BINARY, COMPRESS2, DO, DONT, GMCP, IAC, SB, SE, \
+    SGA, TTYPE, WILL
+from tyderium.util import sleep
+
+import socket as stdsocket
+import unittest
+import zlib
+
+
+MARKER = IAC + SB + COMPRESS2 + IAC + SE
+NOP = bytes([241])
+
+
+class Stream_TestCase(unittest.TestCase):
+  def run_stream(self, server, **attrs):
+    '''Runs server(stream) on one end of a socketpair with small buffers.
+       The other end starts reading once server() returned, and the
+       stream is closed then. Returns what was read.'''
+
+    a, b = stdsocket.socketpair()
+    a.setsockopt(stdsocket.SOL_SOCKET, stdsocket.SO_SNDBUF, 4096)
+    b.setsockopt(stdsocket.SOL_SOCKET, stdsocket.SO_RCVBUF, 4096)
+    a = socket.socket(fileno=a.detach())
+    self.client = socket.socket(fileno=b.detach())
+    received = bytearray()
+    done = []
+
+    def serve():
+      stream = TelnetStream(a)
+      for name, value in attrs.items():
+        setattr(stream, name, value)
+      self.stream = stream
+      server(stream)
+      done.append(True)
+      stream.close()
+
+    def client():
+      while not done:
+        sleep(0.01)
+      while True:
+        data = self.client.recv(65536)
+        if not data:
+          break
+        received.extend(data)
+
+    with Hub(default_signals=False) as hub:
+      hub.spawn(serve)
+      hub.spawn(client)
+      hub.switch()
+    self.client.close()
+    return bytes(received)
+
+
+class Output_TestCase(Stream_TestCase):
+  def test_drop_policy(self):
+    '''Tests that 'drop' keeps the backlog under output_limit'''
+
+    messages = [b'%05d' % i + b'x' * 95 for i in range(1000)]
+
+    def server(stream):
+      for message in messages:
+        stream.send(message)
+        self.assertLessEqual(stream.output_stats.backlog, 8192)
+
+    received = self.run_stream(server, output_policy='drop',
+                               output_limit=8192)
+    stats = self.stream.output_stats
+    self.assertFalse(stats.disconnected)
+    self.assertGreater(stats.dropped, 0)
+    self.assertLessEqual(stats.max_backlog, 8192 + 100)
+    self.assertEqual(len(received), stats.sent)
+    self.assertEqual(len(received) + stats.dropped, 100 * len(messages))
+    # whole messages are dropped, the ones left arrive in order
+    got = [received[i:i + 100] for i in range(0, len(received), 100)]
+    self.assertEqual(got, [m for m in messages if m in got])
+
+  def test_disconnect_policy(self):
+    '''Tests that 'disconnect' shuts the socket down on overflow'''
+
+    def server(stream):
+      for i in range(1000):
+        stream.send(b'x' * 100)
+      self.assertTrue(stream.output_stats.disconnected)
+
+    received = self.run_stream(server, output_policy='disconnect',
+                               output_limit=8192)
+    stats = self.stream.output_stats
+    self.assertTrue(stats.disconnected)
+    self.assertLess(len(received), 100 * 1000)
+    self.assertEqual(stats.dropped, 100 * 1000 - stats.sent)
+
+  def compressed(self, **attrs):
+    messages = [b'line %05d\r\n' % i for i in range(3000)]
+
+    def server(stream):
+      self.client.send(IAC + DO + COMPRESS2 + b'go\n')
+      self.assertEqual(stream.readline(), 'go\n')
+      self.assertTrue(stream.compressed)
+      for message in messages:
+        stream.send(message)
+
+    received = self.run_stream(server, **attrs)
+    self.assertFalse(self.stream.output_stats.disconnected)
+    self.assertTrue(received.startswith(MARKER))
+    decompress = zlib.decompressobj()
+    text = decompress.decompress(received[len(MARKER):])
+    self.assertTrue(decompress.eof)
+    self.assertEqual(decompress.unused_data, b'')
+    lines = text.splitlines(True)
+    self.assertEqual(lines, [m for m in messages if m in lines])
+    return lines
+
+  def test_compressed_output(self):
+    '''Tests that output after the MCCP marker is one zlib stream'''
+
+    self.assertEqual(len(self.compressed()), 3000)
+
+  def test_compressed_output_dropped(self):
+    '''Tests that dropping keeps the zlib stream intact'''
+
+    lines = self.compressed(output_policy='drop', output_limit=8192)
+    self.assertLess(len(lines), 3000)
+    self.assertGreater(self.stream.output_stats.dropped, 0)
+
+  def test_high_water_closed_peer(self):
+    '''Tests that another branch sending to a dead client doesn't fail'''
+
+    a, b = stdsocket.socketpair()
+    a = socket.socket(fileno=a.detach())
+    b.close()
+    errors = []
+
+    def sender():
+      try:
+        for i in range(30):
+          stream.send(b'x' * 1024)
+      except Exception as e:
+        errors.append(e)
+
+    with Hub(default_signals=False) as hub:
+      stream = TelnetStream(a) # read by this branch
+      hub.spawn(sender)
+      hub.switch()
+      self.assertEqual(errors, [])
+      self.assertTrue(stream.output_stats.disconnected)
+      self.assertRaises(ConnectionClosed, stream.readline)
+    a.close()
+
+
+class Input_TestCase(Stream_TestCase):
+  def read(self, data, reader):
+    '''Sends data to the stream, then runs reader(stream), with the input
+       received in chunks of 1, 2, 3 and 1024 bytes. Returns the output
+       of the last run.'''
+
+    for size in (1, 2, 3, 1024):
+      def server(stream):
+        self.client.send(data)
+        reader(stream)
+      received = self.run_stream(server, buffer_size=size)
+    return received
+
+  def test_plain_lines(self):
+    '''Tests lines without any commands'''
+
+    def reader(stream):
+      self.assertEqual(stream.readline(), 'look\r\n')
+      self.assertEqual(stream.readline(), 'north\r\n')
+    self.read(b'look\r\nnorth\r\n', reader)
+
+  def test_escaped_iac(self):
+    '''Tests that IAC IAC is a 0xff data byte'''
+
+    def reader(stream):
+      self.assertEqual(stream.readline('latin1'), 'a\xffb\xff\xff\n')
+    self.read(IAC + WILL + BINARY + b'a' + IAC + IAC + b'b' + IAC + IAC
+              + IAC + IAC + b'\n', reader)
+
+  def test_null_stripped(self):
+    '''Tests that NUL bytes are dropped from the data'''
+
+    def reader(stream):
+      self.assertEqual(stream.readline(), 'ab\r\n')
+      self.assertEqual(stream.readline(), 'cd\n')
+    self.read(b'a\x00b\r\n\x00cd\n', reader)
+
+  def test_commands_between_data(self):
+    '''Tests that negotiation in the middle of a line is taken out'''
+
+    def reader(stream):
+      self.assertEqual(stream.readline(), 'say hi\n')
+    received = self.read(b'say' + IAC + DO + SGA + b' h' + IAC + NOP + b'i'
+                         + IAC + WILL + bytes([42]) + b'\n', reader)
+    self.assertEqual(received, IAC + WILL + SGA + IAC + DONT + bytes([42]))
+
+  def test_subnegotiation(self):
+    '''Tests SB ... SE, also with IAC IAC inside'''
+
+    got = []
+
+    def reader(stream):
+      stream.gmcp_handler = lambda package, data: got.append((package, data))
+      self.assertEqual(stream.readline(), 'x\n')
+      self.assertEqual(stream.options.term, 'xterm')
+    self.read(IAC + DO + GMCP
+              + IAC + SB + TTYPE + bytes([0]) + b'xterm' + IAC + SE
+              + b'x' + IAC + SB + GMCP + b'Core.Hello {"v":"' + IAC + IAC
+              + b'"}' + IAC + SE + b'\n', reader)
+    self.assertEqual(got, [('Core.Hello', {'v': '\ufffd'})] * 4)
+
+  def test_line_buffered(self):
+    '''Tests line_buffered() with pipelined and partial lines'''
+
+    def server(stream):
+      self.assertFalse(stream.line_buffered())
+      self.client.send(b'one\ntwo\nthr')
+      self.assertEqual(stream.readline(), 'one\n')
+      self.assertTrue(stream.line_buffered())
+      self.assertEqual(stream.readline(), 'two\n')
+      self.assertFalse(stream.line_buffered())
+      self.client.send(b'ee\n')
+      self.assertEqual(stream.readline(), 'three\n')
+    self.run_stream(server)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Spawns CLONES clones of one room through ObjectCache.get('/rooms/cell#')
+and reports the time taken and how much the resident set grew, next to
+making them with copy.deepcopy() of the room, as clones used to be.
+
+Every run happens in a forked process of its own, so that one doesn't
+inherit the other's memory. A temporary database is created for the run.
+
+Run from the top of the tree: python3 tools/bench_clones.py
+"""
+
+import copy
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mudpy import config
+from mudpy import room
+from mudpy.database import Object_ID, ObjectCache
+from mudpy.utils.memory import statm
+
+CLONES = 100000
+ROOM = '''--- !Room
+short_description: A prison cell
+long_description: >
+    Damp stone walls surround you on all sides. A narrow slit high up
+    lets in a little light, and a heavy door with a barred window leads
+    out to the corridor.
+exits:
+    north: !ID /rooms/corridor
+    south: !ID /rooms/yard
+    up: !ID /rooms/tower
+'''
+
+
+def deepcopy():
+    # what ObjectCache.get() used to do for every clone
+    clones = {}
+    for i in range(CLONES):
+        base = ObjectCache().get(Object_ID('/rooms/cell'))
+        obj = copy.deepcopy(base)
+        obj.oid = Object_ID('/rooms/cell#%d' % (i + 1))
+        clones[obj.oid] = obj
+    return clones
+
+def clone():
+    oid = Object_ID('/rooms/cell#')
+    return [ObjectCache().get(oid, room.Room) for i in range(CLONES)]
+
+def run(fun):
+    rfd, wfd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        ObjectCache().get(Object_ID('/rooms/cell'))
+        rss = statm()[1]
+        start = time.time()
+        clones = fun()
+        elapsed = time.time() - start
+        os.write(wfd, b'%f %d\n' % (elapsed, statm()[1] - rss))
+        os._exit(0)
+    os.close(wfd)
+    os.waitpid(pid, 0)
+    with os.fdopen(rfd) as result:
+        elapsed, rss = result.read().split()
+    return float(elapsed), int(rss)
+
+if __name__ == '__main__':
+    config.db.path = tempfile.mkdtemp()
+    try:
+        os.mkdir(os.path.join(config.db.path, 'rooms'))
+        with open(os.path.join(config.db.path, 'rooms', 'cell'), 'w') as fd:
+            fd.write(ROOM)
+        for fun in (deepcopy, clone):
+            elapsed, rss = run(fun)
+            print('{:8} {} clones {:7.3f}s {:6.1f} MB, {:5.0f} bytes/clone'
+                  .format(fun.__name__, CLONES, elapsed, rss / (1 << 20),
+                          rss / CLONES))
+    finally:
+        shutil.rmtree(config.db.path)
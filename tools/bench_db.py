@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Boots a world of OBJECTS rooms from YAML and from the marshal format:
+every room is read with DB.load(), as the ObjectCache does on a miss,
+and saved again with DB.save_obj(). The world is converted in between
+with tools/convert_db.py.
+
+A temporary database is created for the run.
+
+Run from the top of the tree: python3 tools/bench_db.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from convert_db import convert
+from mudpy import config
+from mudpy import room
+from mudpy.database import DB, Object_ID, serializers
+
+OBJECTS = 50000
+ROOM = '''--- !Room
+short_description: Room {0}
+long_description: >
+    You are standing on a winding path through the forest, mark {0}. Old
+    trees lean over the path from both sides and the ground is soft with
+    fallen leaves.
+exits:
+    north: !ID /rooms/r{1}
+    south: !ID /rooms/r{2}
+'''
+
+
+def size(path):
+    return sum(os.path.getsize(os.path.join(dirpath, filename))
+               for dirpath, dirnames, filenames in os.walk(path)
+               for filename in filenames)
+
+def run(format, oids):
+    config.db.format = format
+    start = time.time()
+    objs = [DB().load(oid) for oid in oids]
+    loaded = time.time() - start
+    start = time.time()
+    for obj in objs:
+        obj.save()
+    saved = time.time() - start
+    print('{:8} load {:7.2f}s {:6.1f} us/object  save {:7.2f}s  {:5.1f} MB'
+          .format(format, loaded, loaded / len(oids) * 1e6, saved,
+                  size(config.db.path) / (1 << 20)))
+
+if __name__ == '__main__':
+    config.db.path = tempfile.mkdtemp()
+    try:
+        os.mkdir(os.path.join(config.db.path, 'rooms'))
+        for i in range(OBJECTS):
+            with open(os.path.join(config.db.path, 'rooms', 'r%d' % i),
+                      'w') as fd:
+                fd.write(ROOM.format(i, (i + 1) % OBJECTS, (i - 1) % OBJECTS))
+        oids = [Object_ID('/rooms/r%d' % i) for i in range(OBJECTS)]
+        print('{} objects'.format(OBJECTS))
+        run('yaml', oids)
+        start = time.time()
+        convert(config.db.path, serializers['marshal'])
+        print('converted to marshal in {:.2f}s'.format(time.time() - start))
+        run('marshal', oids)
+    finally:
+        shutil.rmtree(config.db.path)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Pipelined echo load against a tyderium echo server.
+
+Each client writes BURST small requests back-to-back, then reads the
+echoes, for ROUNDS rounds. The server side reads with socket.recv() and
+echoes with sendall(), once waiting on the loop before every read and
+once trying the read first (socket.recv_first).
+
+Run from the top of the tree: python3 tools/bench_echo.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from greenlet import getcurrent
+from tyderium import socket
+from tyderium.hub import Hub
+from tyderium.server import Listener
+
+CLIENTS = 50
+ROUNDS = 100
+BURST = 32
+MESSAGE = b'x' * 64
+
+
+def echo(sock, addr):
+    while True:
+        data = sock.recv(256)
+        if not data:
+            break
+        sock.sendall(data)
+    sock.close()
+
+def client(port, done):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.connect(('127.0.0.1', port))
+    expected = len(MESSAGE) * BURST
+    for i in range(ROUNDS):
+        for j in range(BURST):
+            sock.send(MESSAGE)
+        got = 0
+        while got < expected:
+            got += len(sock.recv(65536))
+    sock.close()
+    done.append(sock)
+    if len(done) == CLIENTS:
+        getcurrent().hub.stop()
+
+def run(recv_first):
+    socket.socket.recv_first = recv_first
+    listener = Listener(('127.0.0.1', 0), echo)
+    done = []
+    with Hub(default_signals=False) as hub:
+        hub.spawn(listener.serve)
+        for i in range(CLIENTS):
+            hub.spawn(client, listener.addr[1], done)
+        start = time.time()
+        hub.switch()
+        elapsed = time.time() - start
+    listener.close()
+    return CLIENTS * ROUNDS * BURST / elapsed
+
+if __name__ == '__main__':
+    for recv_first in (False, True):
+        print('recv_first={!s:5} {:9.0f} requests/s'.format(
+            recv_first, run(recv_first)))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Gets /rooms/sample1 from the ObjectCache ROUNDS times, each time through
+a newly built Object_ID, and counts how often the database was read.
+
+A temporary database holding the one room is created for the run.
+
+Run from the top of the tree: python3 tools/bench_object_cache.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mudpy import config
+from mudpy import database
+from mudpy import room
+from mudpy.database import DB, Object_ID, ObjectCache
+
+ROUNDS = 100000
+ROOM = '''--- !Room
+short_description: A small room
+long_description: You are standing in a small room.
+exits: {}
+'''
+
+loads = 0
+_load = DB.load
+
+def _counting_load(self, *args, **kwargs):
+    global loads
+    loads += 1
+    return _load(self, *args, **kwargs)
+
+DB.load = _counting_load
+
+
+if __name__ == '__main__':
+    config.db.path = tempfile.mkdtemp()
+    try:
+        os.mkdir(os.path.join(config.db.path, 'rooms'))
+        with open(os.path.join(config.db.path, 'rooms', 'sample1'), 'w') as fd:
+            fd.write(ROOM)
+        start = time.time()
+        for i in range(ROUNDS):
+            ObjectCache().get(Object_ID('/rooms/sample1'))
+        elapsed = time.time() - start
+    finally:
+        shutil.rmtree(config.db.path)
+    print('{} gets, {} database reads, {:.2f} us/get'.format(
+        ROUNDS, loads, elapsed / ROUNDS * 1e6))
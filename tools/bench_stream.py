@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Feeds 1 MB through tyderium.stream.InputStream in 1-byte and 8 KB chunks.
+
+Workloads: 80-byte lines read with readline(), one 64 KB line (a large
+header block), and the whole megabyte read with readblock().
+
+Run from the top of the tree: python3 tools/bench_stream.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tyderium.stream import InputStream
+
+TOTAL = 1 << 20
+
+
+class Feeder(object):
+    """Serves ``data`` at most ``chunk`` bytes per call"""
+
+    def __init__(self, data, chunk):
+        self.data = memoryview(data)
+        self.chunk = chunk
+        self.pos = 0
+
+    def recv(self, size):
+        size = min(size, self.chunk)
+        res = self.data[self.pos:self.pos + size].tobytes()
+        self.pos += len(res)
+        return res
+
+    def recv_into(self, buffer, nbytes=0):
+        size = min(nbytes or len(buffer), self.chunk)
+        res = self.data[self.pos:self.pos + size]
+        buffer[:len(res)] = res
+        self.pos += len(res)
+        return len(res)
+
+
+def lines(chunk):
+    data = (b'x' * 79 + b'\n') * (TOTAL // 80)
+    stream = InputStream(Feeder(data, chunk))
+    for i in range(TOTAL // 80):
+        stream.readline()
+
+def long_line(chunk):
+    data = b'x' * (64 << 10) + b'\r\n\r\n'
+    stream = InputStream(Feeder(data, chunk))
+    stream.readline(b'\r\n\r\n', maxlen=len(data))
+
+def block(chunk):
+    stream = InputStream(Feeder(b'x' * TOTAL, chunk))
+    stream.readblock(TOTAL)
+
+if __name__ == '__main__':
+    for fun in (lines, long_line, block):
+        for chunk in (1, 8192):
+            start = time.time()
+            fun(chunk)
+            print('{:10} chunk={:5} {:8.3f}s'.format(
+                fun.__name__, chunk, time.time() - start))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Measures TelnetStream input decoding throughput in MB/s.
+
+Workloads: plain 80-byte text lines, IAC-heavy lines where every 8 bytes
+of text are followed by an escaped IAC IAC or an IAC NOP command, and
+pasted 64 KB lines, fed in 1 KB and 64 KB chunks and read with readline(). The client
+announces binary mode first so escaped 0xff bytes decode as latin1.
+
+Run from the top of the tree: python3 tools/bench_telnet.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tyderium.telnet import TelnetStream
+
+TOTAL = 4 << 20
+NOP = b'\xff\xf1'
+WILL_BINARY = b'\xff\xfb\x00'
+
+
+class Feeder(object):
+    """Serves ``data`` at most ``size`` bytes per ``recv()``"""
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def recv(self, size):
+        res = self.data[self.pos:self.pos + size].tobytes()
+        self.pos += len(res)
+        return res
+
+    def sendv(self, buffers, timeout=None, *args, block=True):
+        return sum(map(len, buffers))
+
+def plain():
+    return b'x' * 78 + b'\r\n'
+
+def iac_heavy():
+    return (b'x' * 8 + b'\xff\xff' + b'x' * 8 + NOP) * 4 + b'\r\n'
+
+def pasted():
+    return b'x' * (64 << 10) + b'\r\n'
+
+def run(make_line, chunk):
+    line = make_line()
+    count = TOTAL // len(line)
+    stream = TelnetStream(Feeder(WILL_BINARY + line * count))
+    stream.buffer_size = chunk
+    start = time.time()
+    for i in range(count):
+        stream.readline(binarycodec='latin1', maxlen=len(line))
+    return len(line) * count / (time.time() - start) / (1 << 20)
+
+if __name__ == '__main__':
+    for fun in (plain, iac_heavy, pasted):
+        for chunk in (1024, 65536):
+            print('{:10} chunk={:5} {:8.2f} MB/s'.format(
+                fun.__name__, chunk, run(fun, chunk)))
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Counts libev watcher structures allocated per blocking call.
+
+Workloads, each between two greenlets so that every call has to wait on
+the loop:
+
+  recv       one-byte ping-pong over a socketpair, every recv() under a
+             timeout (the socket's own Io watchers are kept per socket,
+             the timeout's Timer comes from the pool)
+  sleep      sleep(0), which waits on an Idle watcher
+  queue      ping-pong over two Queues, get() waits on a Condition
+
+Every workload runs with the hub's watcher pool disabled (size=0, the
+behaviour before pooling) and enabled.
+
+Run from the top of the tree: python3 tools/bench_watch_alloc.py
+"""
+
+import os
+import sys
+import socket as stdsocket
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tyderium import lib
+from tyderium import socket
+from tyderium.hub import Hub
+from tyderium.sky import Queue
+from tyderium.util import sleep
+
+ROUNDS = 20000
+
+allocated = 0
+_watch_init = lib._Watch.__init__
+
+def _counting_init(self, *args, **kwargs):
+    global allocated
+    allocated += 1
+    _watch_init(self, *args, **kwargs)
+
+lib._Watch.__init__ = _counting_init
+
+
+def ping(sock):
+    for i in range(ROUNDS):
+        sock.send(b'x')
+        sock.recv(1, 5.0)
+
+def pong(sock):
+    for i in range(ROUNDS):
+        sock.recv(1, 5.0)
+        sock.send(b'x')
+
+def recv(hub):
+    a, b = stdsocket.socketpair()
+    a = socket.socket(fileno=a.detach())
+    b = socket.socket(fileno=b.detach())
+    hub.spawn(pong, b)
+    hub.spawn(ping, a)
+    return [a, b]
+
+def sleeper():
+    for i in range(ROUNDS):
+        sleep()
+
+def sleep_(hub):
+    hub.spawn(sleeper)
+    hub.spawn(sleeper)
+    return []
+
+def queue(hub):
+    queues = [Queue(), Queue()]
+    def player(mine, other, first):
+        for i in range(ROUNDS):
+            if first:
+                other.put(i)
+            mine.get()
+            if not first:
+                other.put(i)
+    hub.spawn(player, queues[1], queues[0], False)
+    hub.spawn(player, queues[0], queues[1], True)
+    return []
+
+def run(workload, pool_size):
+    global allocated
+    with Hub(default_signals=False) as hub:
+        hub.pool.size = pool_size
+        resources = workload(hub)
+        allocated = 0
+        start = time.time()
+        hub.switch()
+        elapsed = time.time() - start
+    for resource in resources:
+        resource.close()
+    return allocated / (2 * ROUNDS), elapsed
+
+if __name__ == '__main__':
+    for workload in (recv, sleep_, queue):
+        for label, size in (('no pool', 0), ('pool', 64)):
+            per_call, elapsed = run(workload, size)
+            print('{:9} {:8} {:6.3f} watchers/call  {:8.0f} calls/s'.format(
+                workload.__name__.rstrip('_'), label, per_call,
+                2 * ROUNDS / elapsed))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Load test for pre-forked serving: CONNECTIONS clients keep sending small
+requests to a server whose handler burns some CPU per request, with the
+server running 1, 2 and 4 worker processes (Listener.serve_forever),
+either sharing one socket or with a SO_REUSEPORT socket each.
+
+Clients run in as many processes as there are cores, each with its own
+hub. Throughput can only scale while there are idle cores left.
+
+Run from the top of the tree: python3 tools/bench_workers.py
+"""
+
+import os
+import signal
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from greenlet import getcurrent
+from tyderium import socket
+from tyderium.hub import Hub
+from tyderium.server import Listener
+
+CONNECTIONS = 200
+DURATION = 3.0
+WORK = 2000
+
+
+def handler(sock, addr):
+    while True:
+        data = sock.recv(256)
+        if not data:
+            break
+        sum(i * i for i in range(WORK))
+        sock.sendall(data)
+    sock.close()
+
+def client(port, deadline, counts):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.connect(('127.0.0.1', port))
+    while time.time() < deadline:
+        sock.send(b'x' * 64)
+        got = 0
+        while got < 64:
+            got += len(sock.recv(256))
+        counts[0] += 1
+    sock.close()
+    counts[1] += 1
+    if counts[1] == counts[2]:
+        getcurrent().hub.stop()
+
+def load(port, connections, deadline, wfd):
+    counts = [0, 0, connections]
+    with Hub(default_signals=False) as hub:
+        for i in range(connections):
+            hub.spawn(client, port, deadline, counts)
+        hub.switch()
+    os.write(wfd, b'%d\n' % counts[0])
+
+def run(workers, reuse_port):
+    listener = Listener(('127.0.0.1', 0), handler, listen_backlog=1024,
+                        reuse_port=reuse_port)
+    server = os.fork()
+    if server == 0:
+        listener.serve_forever(workers)
+        os._exit(0)
+    listener.close()
+    time.sleep(0.2)
+    procs = os.cpu_count() or 1
+    rfd, wfd = os.pipe()
+    deadline = time.time() + DURATION
+    clients = []
+    for i in range(procs):
+        pid = os.fork()
+        if pid == 0:
+            load(listener.addr[1], CONNECTIONS // procs, deadline, wfd)
+            os._exit(0)
+        clients.append(pid)
+    os.close(wfd)
+    for pid in clients:
+        os.waitpid(pid, 0)
+    with os.fdopen(rfd) as results:
+        total = sum(int(line) for line in results)
+    os.kill(server, signal.SIGTERM)
+    os.waitpid(server, 0)
+    return total / DURATION
+
+if __name__ == '__main__':
+    print('{} cores, {} connections'.format(os.cpu_count(), CONNECTIONS))
+    for reuse_port in (False, True):
+        for workers in (1, 2, 4):
+            print('reuse_port={!s:5} workers={} {:9.0f} requests/s'.format(
+                reuse_port, workers, run(workers, reuse_port)))
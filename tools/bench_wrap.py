@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Wraps coloured room descriptions of 1 to 10 KB to 80 columns with
+textwrap.fill() and with mudpy.utils.ansi.fill(), uncached and cached.
+
+Run from the top of the tree: python3 tools/bench_wrap.py
+"""
+
+import os
+import sys
+import textwrap
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mudpy.utils import ansi
+
+ROUNDS = 200
+SENTENCE = ('The walls are made of old ${WHITE}grey stone${DEFAULT} and a '
+            'wooden door leads ${GREEN}north${DEFAULT}. ')
+
+
+def room_text(size):
+    text = SENTENCE * (size // len(SENTENCE) + 1)
+    return ansi.map_string(text, ansi.ANSI_MAP)
+
+def run(fun, text):
+    fun(text, width=80)
+    start = time.time()
+    for i in range(ROUNDS):
+        fun(text, width=80)
+    return (time.time() - start) / ROUNDS * 1e6
+
+if __name__ == '__main__':
+    for size in (1 << 10, 4 << 10, 10 << 10):
+        text = room_text(size)
+        print('{:5} KB  textwrap {:8.1f} us  ansi.fill {:8.1f} us  '
+              'cached {:5.2f} us'.format(size >> 10,
+                run(textwrap.fill, text), run(ansi.fill.__wrapped__, text),
+                run(ansi.fill, text)))
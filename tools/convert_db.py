@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Converts every object in a database directory to one of the formats in
+mudpy.database.serializers, e.g. to marshal for a faster boot, or back to
+YAML to edit them by hand. The files in the old format are removed.
+
+Set db.format in the configuration to the same format, objects saved in
+another one are read but written in db.format again. Files which aren't
+objects, e.g. a README or an editor's backup, are left alone.
+
+Run from the top of the tree: python3 tools/convert_db.py [-t FORMAT] DBPATH
+"""
+
+import optparse
+import os
+import sys
+import time
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mudpy import mudlib # the object classes register their tags
+from mudpy.database import DB, object_class, serializers
+
+
+def serializer_of(filename):
+    for serializer in serializers.values():
+        if serializer.suffix and filename.endswith(serializer.suffix):
+            return serializer
+    for serializer in serializers.values():
+        if not serializer.suffix:
+            return serializer
+
+def convert(dbpath, target):
+    """Converts all objects below dbpath, returns how many were converted"""
+    count = 0
+    for dirpath, dirnames, filenames in os.walk(dbpath):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for filename in filenames:
+            if filename.startswith('.'):
+                continue
+            source = serializer_of(filename)
+            if source is target:
+                continue
+            path = os.path.join(dirpath, filename)
+            path = path[:len(path) - len(source.suffix)]
+            try:
+                tag, state = DB().read(path, source)
+                object_class(tag)
+            except (yaml.YAMLError, ValueError, EOFError, TypeError,
+                    RuntimeError) as e:
+                print('skipping {}: not an object ({})'.format(
+                    os.path.join(dirpath, filename), e), file=sys.stderr)
+                continue
+            DB().write(path, target, tag, state)
+            count += 1
+    return count
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser('%prog [options] dbpath')
+    parser.add_option('-t', '--to', dest='format', default='marshal',
+                      choices=list(serializers),
+                      help='format to convert to: ' + ', '.join(serializers)
+                      + ' (default: %default)')
+    options, args = parser.parse_args()
+    if len(args) != 1:
+        parser.error('expected the database directory')
+
+    start = time.time()
+    count = convert(args[0], serializers[options.format])
+    print('{} objects converted to {} in {:.2f}s'.format(
+        count, options.format, time.time() - start))
@@ -146,14 +146,8 @@ class Request(object):
                 ctype = self.headers.get('Content-Type',
                     'application/x-www-form-urlencoded').strip()
                 if ctype.startswith('application/x-www-form-urlencoded'):
-                    buf = BytesIO()
-                    while True:
-                        chunk = self.body.read(16384)
-                        if not chunk:
-                            break
-                        buf.write(chunk)
                     self._post = urlparse.parse_qsl(
-                        buf.getvalue().decode('ascii'),
+                        str(self.body.getvalue(), 'ascii'),
                         keep_blank_values=True)
                 elif ctype.startswith('multipart/form-data'):
                     fs = cgi.FieldStorage(self.body, environ=environ,
@@ -221,16 +215,8 @@ class Response(object):
                     raise RuntimeError("Wrong number of bytes sent")
             else:
                 self.add_header('Content-Length', str(len(value)))
-            buf = self.make_response()
-            buf.write(value)
-            buf.seek(0, 0)
-            while True:
-                data = buf.read(self._server.buffer_size)
-                if not data:
-                    break
-                bytes = self._socket.send(data)
-                if bytes < len(data):
-                    buf.seek(bytes - len(data), 2)
+            self._socket.sendall_iov(
+                (self.make_response().getbuffer(), value))
             self.state = 'done'
         else:
             raise RuntimeError("Response body is being sent twice")
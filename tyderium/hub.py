@@ -14,6 +14,12 @@ class Branch(greenlet.greenlet):
         self.hub = hub
 
 class Hub(greenlet.greenlet):
+    """Greenlet running the libev loop
+
+    Every watcher shares one of two callback thunks created in
+    ``__enter__``, and ``pool`` recycles the watchers used for blocking
+    calls.
+    """
 
     def __init__(self, default_signals=None, **kwargs):
         if default_signals is None:
@@ -47,6 +53,9 @@ class Hub(greenlet.greenlet):
     def __enter__(self):
         self.handle = lib.ev_loop_new(0)
         self._children = {}
+        self.pool = lib.WatchPool()
+        self._single = lib.ev_callback(self.startsingle)
+        self._multi = lib.ev_callback(self.startmulti)
         if self.default_signals:
             self.spawn(self.sigint)
         return self
@@ -54,11 +63,15 @@ class Hub(greenlet.greenlet):
     def __exit__(self, A, B, C):
         lib.ev_loop_destroy(self.handle)
         del self.handle
+        # thunks are bound to ``self``, drop them to break the cycle
+        del self._single, self._multi
 
     def add_watch(self, watch, value=Nothing, single=True, start=True):
         self._children[lib.ctypes.addressof(watch)] = watch
-        watch._callback = lib.ev_callback(self.startsingle
-            if single else self.startmulti)
+        if single:
+            watch._callback = self._single
+        else:
+            watch._callback = self._multi
         if value is Nothing:
             watch.value = ()
         else:
@@ -70,6 +83,11 @@ class Hub(greenlet.greenlet):
         self._children.pop(lib.ctypes.addressof(watch))
         watch.stop_function(self.handle, watch)
 
+    def discard_watch(self, watch):
+        """Stop ``watch`` if it is still started"""
+        if self._children.pop(lib.ctypes.addressof(watch), None) is not None:
+            watch.stop_function(self.handle, watch)
+
     def startsingle(self, loop, ptr, event):
         try:
             watch = self._children.pop(ptr)
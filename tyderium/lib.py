@@ -42,15 +42,20 @@ class _Watch(ctypes.Structure):
     __slots__ = ('branch', 'value')
 
     def __init__(self, value=None):
+        self.branch = None
         self.value = value
         super().__init__(_active=0, _pending=0, _priority=0, _data=0)
 
+    def set(self):
+        pass
+
     def start(self):
         branch = self.branch = getcurrent()
         branch.hub.add_watch(self)
         result = branch.hub.switch()
 
         if result and result == 'tyderium timeout':
+          branch.hub.discard_watch(self)
           raise TimeoutError
 
 ev_callback = ctypes.CFUNCTYPE(None,
@@ -74,6 +79,9 @@ class Io(_Watch):
 
     def __init__(self, fd, events):
         super().__init__()
+        self.set(fd, events)
+
+    def set(self, fd, events):
         while hasattr(fd, 'fileno'):
             fd = fd.fileno()
         self.fd = fd
@@ -115,6 +123,9 @@ class Timer(_Watch):
 
     def __init__(self, at=0.0, repeat=0.0):
         super().__init__()
+        self.set(at, repeat)
+
+    def set(self, at=0.0, repeat=0.0):
         self.at = at
         self.repeat = repeat
 
@@ -143,6 +154,9 @@ class Signal(_Watch):
 
     def __init__(self, signum):
         super().__init__()
+        self.set(signum)
+
+    def set(self, signum):
         self.signum = signum
 
 ev_signal_start = dll.ev_signal_start
@@ -157,6 +171,34 @@ ev_signal_stop.restype = None
 Signal.start_function = ev_signal_start
 Signal.stop_function = ev_signal_stop
 
+class WatchPool(object):
+    """Free-list of stopped watchers, kept per watcher class
+
+    ``get()`` re-arms a pooled watcher with ``set()`` (the equivalent of
+    ``ev_io_set``/``ev_timer_set``) instead of allocating a new structure.
+    Watchers still started in libev are not pooled.
+    """
+
+    def __init__(self, size=64):
+        self.size = size
+        self._free = {}
+
+    def get(self, cls, *args):
+        free = self._free.get(cls)
+        if free:
+            watch = free.pop()
+            watch.set(*args)
+            return watch
+        return cls(*args)
+
+    def put(self, watch):
+        if watch._active or watch._pending:
+            return
+        free = self._free.setdefault(type(watch), [])
+        if len(free) < self.size:
+            watch.branch = watch.value = None
+            free.append(watch)
+
 ev_loop_new = dll.ev_loop_new
 ev_loop_new.argtypes = [ctypes.c_int]
 ev_loop_new.restype = ctypes.POINTER(Loop)
@@ -165,7 +207,7 @@ ev_loop_destroy.argtypes = [ctypes.POINTER(Loop)]
 ev_loop_destroy.restype = None
 ev_run = dll.ev_run
 ev_run.argtypes = [ctypes.POINTER(Loop), ctypes.c_int]
-ev_run.restype = None
+ev_run.restype = ctypes.c_int # non-zero while there are active watchers
 ev_break = dll.ev_break
 ev_break.argtypes = [ctypes.POINTER(Loop), ctypes.c_int]
 ev_break.restype = None
@@ -0,0 +1,107 @@
+import os
+import signal
+import sys
+import time
+import traceback
+
+__all__ = ['prefork', 'worker_slot']
+
+# a worker dying sooner than this after its start is restarted only after
+# a pause, so that a broken worker doesn't turn into a fork loop
+RESTART_DELAY = 1.0
+
+_slot = None
+
+
+def _worker(slot, target, args):
+    global _slot
+    _slot = slot
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    code = 0
+    try:
+        target(*args)
+    except KeyboardInterrupt:
+        pass
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+def _terminate(signum, frame):
+    raise SystemExit(0)
+
+def worker_slot():
+    """Returns the slot of this worker process, from 0 to ``workers - 1``
+
+    A restarted worker gets the slot of the one it replaces. Outside of a
+    worker started by ``prefork`` this is None.
+    """
+    return _slot
+
+def prefork(workers, target, *args):
+    """Runs ``target(*args)`` in ``workers`` forked processes
+
+    Every worker runs its own ``Hub``, so create the hub in ``target``, not
+    before forking. Sockets created before, e.g. a ``Listener``, are shared
+    by all workers. Workers which exit are restarted, until the supervising
+    process gets SIGINT or SIGTERM, which it passes on to the workers
+    before returning.
+    """
+    children = {}
+
+    def spawn(slot):
+        pid = os.fork()
+        if pid == 0:
+            _worker(slot, target, args)
+        children[pid] = slot, time.time()
+
+    old_handler = signal.signal(signal.SIGTERM, _terminate)
+    try:
+        for slot in range(workers):
+            spawn(slot)
+        while True:
+            pid, status = os.wait()
+            if pid not in children:
+                continue
+            slot, started = children.pop(pid)
+            if time.time() - started < RESTART_DELAY:
+                time.sleep(RESTART_DELAY)
+            spawn(slot)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, old_handler)
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+
+
+if __name__ == '__main__':
+    from .hub import Hub
+    from .server import Listener
+
+    def echo(sock, addr):
+        data = sock.recv(4096)
+        while data:
+            sock.send(('%d: ' % os.getpid()).encode() + data)
+            data = sock.recv(4096)
+
+    listener = Listener(('127.0.0.1', 0), echo)
+    print("Listening on", listener.addr, "with 4 workers")
+
+    def serve():
+        with Hub() as hub:
+            hub.spawn(listener.serve)
+            hub.switch()
+
+    prefork(4, serve)
@@ -2,9 +2,20 @@ import os, os.path
 from greenlet import getcurrent
 
 from . import socket
+from .prefork import prefork, worker_slot
 
 class Listener(object):
-    def __init__(self, addr, factory, listen_backlog=128, spawn=True, fd=None, pf=socket.AF_INET):
+    """Accepts connections and runs ``factory(sock, addr)`` for each
+
+    With ``reuse_port=True`` the socket is bound with ``SO_REUSEPORT``, so
+    that several listeners on the same address get a kernel balanced
+    accept queue each. That is not available for ``AF_UNIX`` sockets.
+    """
+    def __init__(self, addr, factory, listen_backlog=128, spawn=True, fd=None, pf=socket.AF_INET, reuse_port=False):
+        if pf == socket.AF_UNIX and reuse_port:
+            raise ValueError('reuse_port is not supported for AF_UNIX')
+        if reuse_port and fd is None and not hasattr(socket, 'SO_REUSEPORT'):
+            raise socket.error('SO_REUSEPORT is not supported on this platform')
         if pf == socket.AF_UNIX:
             self.sock = socket.socket(pf, socket.SOCK_STREAM, 0, fd)
             if fd is None and os.path.exists(addr):
@@ -19,12 +30,17 @@ class Listener(object):
             self.sock = socket.socket(pf, socket.SOCK_STREAM, 0, fd)
             if fd is None:
                 self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                if reuse_port:
+                    self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         try:
             if fd is None:
                 self.sock.bind(addr)
                 self.sock.listen(listen_backlog)
             self.factory = factory
             self.spawn = spawn
+            self.listen_backlog = listen_backlog
+            self.pf = pf
+            self.reuse_port = reuse_port
             self.addr = self.sock.getsockname()
         except:
             self.sock.close()
@@ -39,11 +55,32 @@ class Listener(object):
             else:
                 self.factory(sock, addr)
 
-    def serve_forever(self):
-        from .hub import Hub
-        with Hub() as hub:
-            hub.spawn(self.serve)
-            hub.switch()
+    def serve_forever(self, workers=0):
+        """Serves from a hub of its own
+
+        With ``workers`` the hub runs in as many forked processes (see
+        ``prefork``). They share this socket, or with ``reuse_port`` the
+        first worker serves this socket and every other one binds a socket
+        of its own to ``addr``. This socket stays open meanwhile, so
+        connections queue up rather than being refused while workers start.
+        """
+        if not workers:
+            from .hub import Hub
+            with Hub() as hub:
+                hub.spawn(self.serve)
+                hub.switch()
+        elif self.reuse_port:
+            prefork(workers, self.__serve_reopened)
+        else:
+            prefork(workers, self.serve_forever)
+
+    def __serve_reopened(self):
+        if worker_slot() == 0:
+            self.serve_forever()
+            return
+        self.close()
+        Listener(self.addr, self.factory, self.listen_backlog, self.spawn,
+                 pf=self.pf, reuse_port=True).serve_forever()
 
     def close(self):
         self.sock.close()
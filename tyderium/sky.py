@@ -8,11 +8,13 @@ class Condition(object):
         self._consumers = deque()
 
     def wait(self):
-        watch = lib.Idle()
-        branch = watch.branch = getcurrent()
+        branch = getcurrent()
+        watch = branch.hub.pool.get(lib.Idle)
+        watch.branch = branch
         branch.hub.add_watch(watch, start=False)
         self._consumers.append(watch)
         branch.hub.switch()
+        branch.hub.pool.put(watch)
 
     def notify(self):
         if self._consumers:
@@ -1,27 +1,68 @@
 from . import lib
 from .timeout import Timeout
+from .timeout_error import TimeoutError
+from .util import sleep
 
 import greenlet
 
 import errno
+import os
 import socket as stdsocket
 
 from socket import * # for convenience
 from socket import timeout as timeout_error
 
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
 
 class socket(stdsocket.socket):
-    __slots__ = ()
+    __slots__ = ('_rwatch', '_wwatch', '_reads')
+    # recv() and recv_into() try the socket before waiting on the loop, and
+    # yield to other branches after ``recv_budget`` reads in a row that
+    # didn't block
+    recv_first = True
+    recv_budget = 16
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.setblocking(False)
+        self._rwatch = None
+        self._wwatch = None
+        self._reads = 0
+
     def __wait(self, events, timeout=None):
+        # The socket keeps one read and one write watcher for its lifetime,
+        # they are only re-armed here. A pooled watcher is used when another
+        # branch is already waiting for the same event.
+        if events == lib.EV_READ:
+            if self._rwatch is None:
+                self._rwatch = lib.Io(self.fileno(), events)
+            watch = self._rwatch
+        else:
+            if self._wwatch is None:
+                self._wwatch = lib.Io(self.fileno(), events)
+            watch = self._wwatch
+        pool = None
+        if watch.branch is not None:
+            pool = greenlet.getcurrent().hub.pool
+            watch = pool.get(lib.Io, self.fileno(), events)
         try:
-            with Timeout(timeout if timeout else super().gettimeout()):
-                lib.Io(fd=self.fileno(), events=events).start()
+            timeout = timeout if timeout else super().gettimeout()
+            if timeout:
+                with Timeout(timeout):
+                    watch.start()
+            else:
+                watch.start()
         except TimeoutError:
             raise timeout_error
+        finally:
+            if pool is None:
+                watch.branch = None
+            else:
+                pool.put(watch)
 
     def connect(self, addr, timeout=None):
         ret = self.connect_ex(addr)
@@ -41,33 +82,89 @@ class socket(stdsocket.socket):
             self.__wait(lib.EV_WRITE, timeout)
 
     def sendall(self, value, timeout=None, *args, **kwargs):
+        view = memoryview(value).cast('B')
         while True:
-            bytes = self.send(value, timeout, *args, **kwargs)
-            if bytes >= len(value):
+            bytes = self.send(view, timeout, *args, **kwargs)
+            if bytes >= len(view):
                 return
-            value = value[bytes:]
+            view = view[bytes:]
+
+    def sendv(self, buffers, timeout=None, *args, block=True):
+        """Sends a sequence of buffers with a single ``sendmsg`` call
+
+        Returns number of bytes sent, like ``send()``. At most ``IOV_MAX``
+        buffers are accepted. With ``block=False`` returns 0 instead of
+        waiting when the socket is not writable.
+        """
+        if not hasattr(stdsocket.socket, 'sendmsg'): # win32
+            return self.send(b''.join(buffers), timeout, *args)
+        while True:
+            try:
+                return super().sendmsg(buffers, *args)
+            except stdsocket.error as err:
+                if err.errno not in (errno.EWOULDBLOCK, errno.EAGAIN, errno.EINTR):
+                    raise
+            if not block:
+                return 0
+            self.__wait(lib.EV_WRITE, timeout)
+
+    def sendall_iov(self, buffers, timeout=None, *args):
+        """Sends all of the buffers in order without joining them
+
+        Partial writes are resumed through memoryview offsets, so neither
+        the buffers nor their remainders are copied.
+        """
+        views = [memoryview(buf).cast('B') for buf in buffers]
+        views = [view for view in views if view]
+        first = 0
+        while first < len(views):
+            bytes = self.sendv(views[first:first + IOV_MAX], timeout, *args)
+            while bytes:
+                size = len(views[first])
+                if bytes < size:
+                    views[first] = views[first][bytes:]
+                    break
+                bytes -= size
+                first += 1
 
     def recv(self, size, timeout=None, *args, **kwargs):
+        return self.__read(super().recv, b'', timeout,
+            size, *args, **kwargs)
+
+    def recv_into(self, buffer, nbytes=0, timeout=None, *args, **kwargs):
+        return self.__read(super().recv_into, 0, timeout,
+            buffer, nbytes, *args, **kwargs)
+
+    def __read(self, read, closed, timeout, *args, **kwargs):
+        wait = not self.recv_first
         while True:
             fd = self.fileno()
             if fd < 0:
-                return b''
-            self.__wait(lib.EV_READ, timeout)
+                return closed
+            if wait:
+                self.__wait(lib.EV_READ, timeout)
+                self._reads = 0
+            elif self._reads >= self.recv_budget:
+                sleep()
+                self._reads = 0
             try:
-                return super().recv(size, *args, **kwargs)
+                data = read(*args, **kwargs)
             except stdsocket.error as err:
                 if err.errno in (errno.EWOULDBLOCK, errno.EAGAIN, errno.EINTR):
+                    wait = True
                     continue
                 raise
+            if not wait:
+                self._reads += 1
+            return data
 
     def accept(self, timeout=None):
         while True:
             self.__wait(lib.EV_READ, timeout)
             try:
-                sock, addr = super().accept()
-                sock.setblocking(False)
-                sock.__class__ = socket
-                return sock, addr
+                fd, addr = self._accept()
+                return socket(self.family, self.type, self.proto,
+                    fileno=fd), addr
             except stdsocket.error as err:
                 if err.errno in (errno.EWOULDBLOCK, errno.EAGAIN, errno.EINTR):
                     continue
@@ -6,10 +6,22 @@ class LineTooLong(IOError): pass
 class ConnectionClosed(IOError): pass
 
 class InputStream(socket):
-    __slots__ = ('_buf', 'recvfun')
+    """Buffered reader on top of a socket
+
+    Data lives in one preallocated ``bytearray`` between ``_pos`` and
+    ``_end`` and is received straight into its free tail with
+    ``recv_into`` when the source has one. Consumed data is never copied
+    again: reads only advance ``_pos``, and the unread remainder is moved
+    to the front only when the tail runs out of room.
+    """
+    __slots__ = ('_buf', '_view', '_pos', '_end', 'recvfun', 'recvintofun')
     buffer_size = 8192
     def __init__(self, socket):
-        self._buf = b''
+        self._buf = bytearray(self.buffer_size)
+        self._view = memoryview(self._buf)
+        self._pos = 0
+        self._end = 0
+        self.recvintofun = getattr(socket, 'recv_into', None)
         if hasattr(socket, 'recv'):
             self.recvfun = socket.recv
         elif hasattr(socket, 'read'):
@@ -17,7 +29,43 @@ class InputStream(socket):
         elif hasattr(socket, '__call__'):
             self.recvfun = socket
         else:
-            raise NotImplemenetedError()
+            raise NotImplementedError()
+
+    def _fill(self):
+        """Receives next chunk into the buffer, returns its size"""
+        end = self._end
+        if self._pos == end:
+            self._pos = end = 0
+        elif len(self._buf) - end < self.buffer_size:
+            end = self._compact()
+        if self.recvintofun is not None:
+            nbytes = self.recvintofun(self._view[end:end + self.buffer_size])
+        else:
+            chunk = self.recvfun(self.buffer_size)
+            nbytes = len(chunk)
+            self._view[end:end + nbytes] = chunk
+        self._end = end + nbytes
+        return nbytes
+
+    def _compact(self):
+        """Moves unread data to the front, growing the buffer if needed"""
+        size = self._end - self._pos
+        if len(self._buf) - size < self.buffer_size:
+            buf = bytearray(max(2 * len(self._buf), size + self.buffer_size))
+            buf[:size] = self._view[self._pos:self._end]
+            self._buf = buf
+            self._view = memoryview(buf)
+        else:
+            self._buf[:size] = self._buf[self._pos:self._end]
+        self._pos = 0
+        self._end = size
+        return size
+
+    def _take(self, size):
+        pos = self._pos
+        res = self._view[pos:pos + size].tobytes()
+        self._pos = pos + len(res)
+        return res
 
     def readline(self, endline=b'\n', maxlen=16384):
         """Reads a line from a socket
@@ -29,21 +77,21 @@ class InputStream(socket):
         Use this method for short lines (length of few kilobytes)
         """
         suflen = len(endline)
+        start = self._pos
 
         while True:
-            idx = self._buf.find(endline)
+            idx = self._buf.find(endline, start, self._end)
             if idx >= 0:
-                idx += suflen
-                res = self._buf[:idx]
-                self._buf = self._buf[idx:]
-                return res
-            oldlen = len(self._buf)
+                return self._take(idx + suflen - self._pos)
+            oldlen = self._end - self._pos
             if maxlen <= oldlen:
                 raise LineTooLong()
-            chunk = self.recvfun(self.buffer_size)
-            if not chunk:
+            if not self._fill():
                 raise ConnectionClosed()
-            self._buf += chunk
+            # only the tail which may hold a partial ``endline`` is rescanned
+            start = self._pos + oldlen - suflen + 1
+            if start < self._pos:
+                start = self._pos
 
     def readblock(self, size):
         """Reads a sized block from a socket
@@ -51,38 +99,33 @@ class InputStream(socket):
         If connection closed before ``size`` bytes are read ``ConnectionClosed``
         is raised. You can get data till end of file using read() method.
 
-        Use this method for short lines (length of few kilobytes)
+        Blocks larger than ``buffer_size`` which are not buffered yet are
+        received straight into a single ``bytearray`` of ``size`` bytes and
+        returned as a ``memoryview`` of it, shorter ones as ``bytes``.
         """
-        if size <= len(self._buf):
-            res = self._buf[:size]
-            self._buf = b''
-            return res
-        if size > self.buffer_size: # long block
-            buf = BytesIO()
-            buf.write(self._buf)
-            self._buf = b''
-            while buf.tell() < size:
-                chunk = self.recvfun(self.buffer_size)
-                if not chunk:
+        avail = self._end - self._pos
+        if size > avail and size > self.buffer_size: # long block
+            view = memoryview(bytearray(size))
+            view[:avail] = self._view[self._pos:self._end]
+            self._pos = self._end = 0
+            got = avail
+            while got < size:
+                if self.recvintofun is not None:
+                    nbytes = self.recvintofun(view[got:])
+                else:
+                    chunk = self.recvfun(min(size - got, self.buffer_size << 3))
+                    nbytes = len(chunk)
+                    view[got:got + nbytes] = chunk
+                if not nbytes:
                     raise ConnectionClosed()
-                buf.write(chunk)
-            buf.seek(0, 0)
-            res = buf.read(size)
-            self._buf = buf.read()
-            return res
-        else: # short block
-            while len(self._buf) < size:
-                chunk = self.recvfun(self.buffer_size)
-                if not chunk:
-                    raise ConnectionClosed()
-                self._buf += chunk
-            res = self._buf[:size]
-            self._buf = self._buf[size:]
-            return res
+                got += nbytes
+            return view
+        while self._end - self._pos < size:
+            if not self._fill():
+                raise ConnectionClosed()
+        return self._take(size)
 
     def read(self, size):
-        if self._buf:
-            res = self._buf[:size]
-            self._buf = self._buf[size:]
-            return res
+        if self._pos < self._end:
+            return self._take(min(size, self._end - self._pos))
         return self.recvfun(size)
@@ -1,18 +1,26 @@
 import errno
+import json
 import socket as stdsocket
+import zlib
 
-from .socket import socket
+from greenlet import getcurrent
+
+from .socket import socket, timeout_error, IOV_MAX, SHUT_RDWR
 from .util import sleep
 
 from telnetlib import AO, AYT, BINARY, BRK, DM, DO, DONT, ECHO, IAC, IP, \
     LINEMODE, NAWS, SB, SGA, SE, TTYPE, TM, WILL, WONT, theNULL
 
+COMPRESS2 = bytes([86]) # MUD Client Compression Protocol v2
+GMCP = bytes([201]) # Generic MUD Communication Protocol
+
 __all__ = [
     'LineTooLong',
     'ConnectionClosed',
     'Interrupt',
     'NoEcho',
     'Options',
+    'OutputStats',
     'TelnetStream'
 ]
 
@@ -46,6 +54,33 @@ class Options:
             self.term, self.window_size[0], self.window_size[1])
 
 
+class OutputStats:
+    """Output counters of one ``TelnetStream``, in bytes"""
+    __slots__ = ('queued', 'sent', 'dropped', 'max_backlog', 'stalls',
+                 'disconnected', 'compress_in', 'compress_out')
+
+    def __init__(self):
+        self.queued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.max_backlog = 0
+        self.stalls = 0 # times the socket was full and the writer had to wait
+        self.disconnected = False
+        self.compress_in = 0 # bytes passed through MCCP compression
+        self.compress_out = 0 # and what they were compressed to
+
+    @property
+    def backlog(self):
+        return self.queued - self.sent - self.dropped
+
+    def __repr__(self):
+        return ('queued=%s,sent=%s,dropped=%s,backlog=%s,max_backlog=%s,'
+                'stalls=%s,disconnected=%s,compress_in=%s,compress_out=%s' % (
+                self.queued, self.sent, self.dropped, self.backlog,
+                self.max_backlog, self.stalls, self.disconnected,
+                self.compress_in, self.compress_out))
+
+
 class _TelnetResponses:
     TELNET_BREAK_RESPONSE = IAC + WILL + TM
     TELNET_IP_RESPONSE    = IAC + WILL + TM
@@ -61,8 +96,11 @@ class _TelnetResponses:
     TELNET_WILL_SGA       = IAC + WILL + SGA
     TELNET_WILL_BINARY    = IAC + WILL + BINARY
     TELNET_WONT_BINARY    = IAC + WONT + BINARY
-    TELNET_AYT_RESPONSE   = '\n[-Yes-]\n'
+    TELNET_AYT_RESPONSE   = b'\r\n[-Yes-]\r\n'
     TELNET_DONT_LINEMODE  = IAC + DONT + LINEMODE
+    TELNET_WILL_COMPRESS2 = IAC + WILL + COMPRESS2
+    TELNET_START_COMPRESS2 = IAC + SB + COMPRESS2 + IAC + SE
+    TELNET_WILL_GMCP      = IAC + WILL + GMCP
 
 
 class NoEcho:
@@ -77,12 +115,57 @@ class NoEcho:
 
 
 class TelnetStream:
+    """Telnet protocol on top of a socket
+
+    Output is corked: ``send()`` only queues data, which is written when
+    the stream is flushed. That happens when the reading branch is about to
+    block for input, on explicit ``flush()``, once ``output_high_water``
+    bytes are queued, and, for data queued by other branches, on a flush
+    spawned for the next loop iteration. A socket error while flushing in
+    another branch than the reading one shuts the connection down, the
+    reading branch sees end of file then.
+
+    Flushing never blocks. Whatever the socket doesn't take right away is
+    handed to a writer branch, and data queued meanwhile waits behind it.
+    Once more than ``output_limit`` bytes are waiting, ``output_policy``
+    decides: ``'drop'`` discards the oldest queued writes, ``'disconnect'``
+    shuts the connection down. With ``'disconnect'`` the connection is also
+    dropped when the writer can't send anything for ``output_timeout``
+    seconds.
+
+    ``request_compression()`` offers MCCP2 to the client. Once accepted,
+    everything sent is deflated with ``compress_level``, and every flush
+    ends with a sync flush so the client can decode what it got so far.
+    Compression happens on flush, after ``'drop'`` made its choices.
+
+    ``request_gmcp()`` offers GMCP. Once the client agrees ``gmcp`` is true,
+    ``send_gmcp()`` sends messages and received ones are passed to
+    ``gmcp_handler(package, data)``, if set.
+    """
     buffer_size = 1024
+    compress_level = 6
+    gmcp_handler = None
+    output_high_water = 16384
+    output_limit = 256 << 10
+    output_policy = 'disconnect'
+    output_timeout = 60.0
 
     def __init__(self, socket):
         self.__socket = socket
+        self.__outq = []
+        self.__outlen = 0
+        self.__backlog = None
+        self.__flush_spawned = False
+        self.__closing = False
+        self.__deflate = None
+        self.__gmcp = False
+        self.__plain = 0 # leading __outq items which go out uncompressed
+        self.__reader = getcurrent()
+        self.__stats = OutputStats()
         self.__rawq = b''
-        self.__dataq = [b'', b'']
+        self.__dataq = [bytearray(), bytearray()]
+        self.__datapos = 0 # start of unread data in __dataq[0]
+        self.__scanpos = 0 # where the next endline search starts
         self.__iacseq = b''
         self.__sb = 0
         self.__input_binary = False
@@ -112,34 +195,205 @@ class TelnetStream:
     def socket(self):
         return self.__socket
 
+    @property
+    def compressed(self):
+        return self.__deflate is not None
+
+    @property
+    def gmcp(self):
+        return self.__gmcp
+
+    @property
+    def output_stats(self):
+        return self.__stats
+
+    def send(self, data):
+        stats = self.__stats
+        stats.queued += len(data)
+        if stats.disconnected:
+            stats.dropped += len(data)
+            return len(data)
+        self.__outq.append(data)
+        self.__outlen += len(data)
+        if stats.backlog > stats.max_backlog:
+            stats.max_backlog = stats.backlog
+        if self.output_limit and stats.backlog > self.output_limit:
+            self.__overflow()
+        elif self.__outlen >= self.output_high_water:
+            if getcurrent() is self.__reader:
+                self.flush()
+            else:
+                # e.g. a broadcast, which shouldn't fail for a dead client
+                self.__flush_elsewhere()
+        elif not self.__flush_spawned and getcurrent() is not self.__reader:
+            # the reading branch flushes before it blocks, anybody else
+            # gets a flush on the next loop iteration
+            self.__flush_spawned = True
+            getcurrent().hub.spawn(self.__spawned_flush)
+        return len(data)
+
+    def flush(self):
+        if not self.__outq or self.__backlog is not None:
+            # the writer branch picks up queued data once it's done
+            return
+        views = self.__take_output()
+        views = self.__consume(views, self.__socket.sendv(
+            views[:IOV_MAX], block=False))
+        if views:
+            self.__backlog = views
+            getcurrent().hub.spawn(self.__write_backlog)
+        elif self.__closing:
+            self.__socket.close()
+
+    def __take_output(self):
+        """Empties the output queue into a list of views to send"""
+        if self.__deflate is not None:
+            self.__compress_queue(zlib.Z_SYNC_FLUSH)
+        views = [memoryview(buf).cast('B') for buf in self.__outq]
+        self.__outq = []
+        self.__outlen = 0
+        return views
+
+    def __compress_queue(self, mode):
+        # items queued ahead of the MCCP start stay plain
+        plain = self.__plain
+        self.__plain = 0
+        data = b''.join(self.__outq[plain:])
+        out = self.__deflate.compress(data) + self.__deflate.flush(mode)
+        self.__outq[plain:] = [out]
+        self.__outlen += len(out) - len(data)
+        stats = self.__stats
+        stats.compress_in += len(data)
+        stats.compress_out += len(out)
+        stats.queued += len(out) - len(data) # the backlog counts wire bytes
+
+    def __consume(self, views, sent):
+        self.__stats.sent += sent
+        first = 0
+        while sent:
+            size = len(views[first])
+            if sent < size:
+                views[first] = views[first][sent:]
+                break
+            sent -= size
+            first += 1
+        return [view for view in views[first:] if view]
+
+    def __write_backlog(self):
+        self.__stats.stalls += 1
+        timeout = self.output_timeout \
+            if self.output_policy == 'disconnect' else None
+        try:
+            while True:
+                views = self.__backlog
+                self.__socket.sendall_iov(views, timeout)
+                self.__stats.sent += sum(map(len, views))
+                if not self.__outq:
+                    break
+                self.__backlog = self.__take_output()
+        except timeout_error:
+            self.__disconnect()
+        except stdsocket.error:
+            pass # the reading branch gets the error
+        finally:
+            self.__backlog = None
+        if self.__closing:
+            self.__socket.close()
+
+    def __overflow(self):
+        if self.output_policy == 'drop':
+            stats = self.__stats
+            # uncompressed items ahead of an MCCP start must stay in place
+            while len(self.__outq) > self.__plain and \
+                    stats.backlog > self.output_limit:
+                size = len(self.__outq.pop(self.__plain))
+                self.__outlen -= size
+                stats.dropped += size
+        else:
+            self.__disconnect()
+
+    def __disconnect(self):
+        stats = self.__stats
+        stats.disconnected = True
+        stats.dropped = stats.queued - stats.sent
+        self.__outq = []
+        self.__outlen = 0
+        self.__plain = 0
+        try:
+            # the reading branch sees end of file and cleans up
+            self.__socket.shutdown(SHUT_RDWR)
+        except stdsocket.error:
+            pass
+
+    def __spawned_flush(self):
+        self.__flush_spawned = False
+        self.__flush_elsewhere()
+
+    def __flush_elsewhere(self):
+        # flushes outside of the reading branch, which is the one to see
+        # the error, as end of file
+        try:
+            self.flush()
+        except stdsocket.error:
+            self.__disconnect()
+
+    def close(self):
+        self.__closing = True
+        try:
+            self.end_compression()
+            self.flush()
+        finally:
+            if self.__backlog is None:
+                self.__socket.close()
+
     def readline(self, binarycodec='utf8', endline='\n', maxlen=1024):
+        self.__reader = getcurrent()
         suffix = endline.encode(binarycodec)
-        suflen = len(endline)
+        suflen = len(suffix)
+        data = self.__dataq[0]
 
         while True:
-            idx = self.__dataq[0].find(suffix)
+            idx = data.find(suffix, self.__scanpos)
             if idx >= 0:
                 idx += suflen
-                res = self.__dataq[0][:idx]
-                self.__dataq[0] = self.__dataq[0][idx:]
+                res = data[self.__datapos:idx]
+                self.__consume_input(idx)
                 if self.output_binary: # I don't understand this block?
                     self.send(b'\r')
                 return res.decode(
                     binarycodec if self.__input_binary else 'ascii')
-            oldlen = len(self.__dataq[0])
+            oldlen = len(data) - self.__datapos
             if maxlen <= oldlen:
                 self.__socket.close()
                 raise LineTooLong()
+            # only the tail which may hold a partial ``endline`` is rescanned
+            self.__scanpos = max(self.__datapos, len(data) - suflen + 1)
             self.__fill_queue()
 
+    def line_buffered(self, binarycodec='utf8', endline='\n'):
+        """Tells whether ``readline()`` can return without receiving"""
+        return self.__dataq[0].find(
+            endline.encode(binarycodec), self.__scanpos) >= 0
+
+    def __consume_input(self, pos):
+        # Read data stays in the queue until it makes up more than half of
+        # it, the rest is moved to the front only then
+        data = self.__dataq[0]
+        if pos * 2 >= len(data):
+            del data[:pos]
+            pos = 0
+        self.__datapos = self.__scanpos = pos
+
     def sendtext(self, text, binarycodec='utf8'):
+        self.send(self.encodetext(text, binarycodec))
+
+    def encodetext(self, text, binarycodec='utf8'):
+        """Returns ``text`` the way ``sendtext()`` puts it on the wire"""
         text = text.replace('\n', '\r\n')
         if self.__output_binary:
-            buf = text.encode(
+            return text.encode(
                 binarycodec, errors='replace').replace(IAC, IAC+IAC)
-        else:
-            buf = text.encode('ascii', errors='replace')
-        self.send(buf)
+        return text.encode('ascii', errors='replace')
 
     def disable_binary_mode(self):
         self.send(_TelnetResponses.TELNET_WONT_BINARY)
@@ -155,48 +409,107 @@ class TelnetStream:
     def request_window_size(self):
         self.send(_TelnetResponses.TELNET_DO_NAWS)
 
+    def request_compression(self):
+        self.send(_TelnetResponses.TELNET_WILL_COMPRESS2)
+
+    def request_gmcp(self):
+        self.send(_TelnetResponses.TELNET_WILL_GMCP)
+
+    def send_gmcp(self, package, data=None):
+        """Sends a GMCP message, ``data`` is encoded as JSON
+
+        Does nothing unless the client accepted GMCP.
+        """
+        if not self.__gmcp:
+            return
+        if data is not None:
+            package += ' ' + json.dumps(data, separators=(',', ':'))
+        self.send(IAC + SB + GMCP + package.encode('utf8').replace(IAC, IAC+IAC)
+                  + IAC + SE)
+
+    def __receive_gmcp(self, payload):
+        package, _, data = bytes(payload).decode(
+            'utf8', errors='replace').partition(' ')
+        try:
+            data = json.loads(data) if data else None
+        except ValueError:
+            return # not for us to fix a broken client
+        if self.gmcp_handler is not None:
+            self.gmcp_handler(package, data)
+
+    def __start_compression(self):
+        if self.__deflate is None:
+            self.send(_TelnetResponses.TELNET_START_COMPRESS2)
+            self.__plain = len(self.__outq)
+            self.__deflate = zlib.compressobj(self.compress_level)
+
+    def end_compression(self):
+        """Finishes the compressed stream, output is plain afterwards"""
+        if self.__deflate is not None:
+            if not self.__stats.disconnected:
+                self.__compress_queue(zlib.Z_FINISH)
+            self.__deflate = None
+
     def __fill_queue(self):
         if not self.__rawq:
+            self.flush()
             self.__rawq = self.__socket.recv(self.buffer_size)
             if not self.__rawq:
                 raise ConnectionClosed()
 
+        # Plain data is copied in runs up to the next IAC, only command
+        # sequences go through the state machine byte by byte
+        raw = self.__rawq
+        end = len(raw)
+        pos = 0
+        strip_null = theNULL in raw
         try:
-          for (i, c) in enumerate(self.__rawq):
-              c = bytes([c])
-              if not self.__iacseq:
-                  if c not in (IAC, theNULL):
-                      self.__dataq[self.__sb] += c
-                  else:
-
-                      if c == IAC:
-                          self.__iacseq += c
-                      continue
-              elif len(self.__iacseq) == 1:
-                  # 'IAC: IAC CMD [OPTION only for WILL/WONT/DO/DONT]'
-                  if c in (DO, DONT, WILL, WONT):
-                      self.__iacseq += c
-                      continue
-
-                  self.__iacseq = b''
-                  if c == IAC:
-                      self.__dataq[self.__sb] += c
-                  else:
-                      if c == SB: # SB ... SE start.
-                          self.__sb = 1
-                          self.__dataq[self.__sb] = b''
-                      elif c == SE:
-                          self.__sb = 0
-                      self.__handle_option(c, self.__dataq[1])
-              elif len(self.__iacseq) == 2:
-                  cmd = self.__iacseq[1:2]
-                  self.__iacseq = b''
-                  if cmd in (DO, DONT):
-                      self.__handle_option(cmd, c)
-                  elif cmd in (WILL, WONT):
-                      self.__handle_option(cmd, c)
+            while pos < end:
+                if not self.__iacseq:
+                    idx = raw.find(IAC, pos)
+                    if idx < 0:
+                        stop = nextpos = end
+                    elif raw[idx + 1:idx + 2] == IAC:
+                        # escaped 0xff data byte, copied along with the run
+                        stop = idx + 1
+                        nextpos = idx + 2
+                    else:
+                        stop = idx
+                        nextpos = idx + 1
+                        self.__iacseq = IAC
+                    if stop > pos:
+                        if strip_null:
+                            self.__dataq[self.__sb] += \
+                                raw[pos:stop].replace(theNULL, b'')
+                        else:
+                            self.__dataq[self.__sb] += memoryview(raw)[pos:stop]
+                    pos = nextpos
+                    continue
+
+                c = raw[pos:pos + 1]
+                pos += 1
+                if len(self.__iacseq) == 1:
+                    # 'IAC: IAC CMD [OPTION only for WILL/WONT/DO/DONT]'
+                    if c in (DO, DONT, WILL, WONT):
+                        self.__iacseq += c
+                        continue
+
+                    self.__iacseq = b''
+                    if c == IAC:
+                        self.__dataq[self.__sb] += c
+                    else:
+                        if c == SB: # SB ... SE start.
+                            self.__sb = 1
+                            self.__dataq[self.__sb] = bytearray()
+                        elif c == SE:
+                            self.__sb = 0
+                        self.__handle_option(c, self.__dataq[1])
+                else:
+                    cmd = self.__iacseq[1:2]
+                    self.__iacseq = b''
+                    self.__handle_option(cmd, c)
         finally:
-            self.__rawq = self.__rawq[i+1:]
+            self.__rawq = raw[pos:]
 
     def __handle_option(self, cmd, opt):
         if cmd == BRK:
@@ -240,6 +553,10 @@ class TelnetStream:
                 self.__output_binary = True
                 if not self.__binary_requested:
                     self.send(_TelnetResponses.TELNET_WILL_BINARY)
+            elif opt == COMPRESS2:
+                self.__start_compression()
+            elif opt == GMCP:
+                self.__gmcp = True
             else:
                 self.send(IAC + WONT + opt)
         elif cmd == DONT:
@@ -247,6 +564,10 @@ class TelnetStream:
                 raise RuntimeError('Client requested "DONT SGA": not supported')
             elif opt == BINARY:
                 self.__output_binary = False
+            elif opt == COMPRESS2:
+                self.end_compression()
+            elif opt == GMCP:
+                self.__gmcp = False
         elif cmd == SE:
             cmd = bytes([opt[0]])
             if cmd == NAWS:
@@ -266,4 +587,6 @@ class TelnetStream:
                 else:
                     termtype = opt[1:]
                 self.__options.term = termtype.decode()
+            elif cmd == GMCP:
+                self.__receive_gmcp(opt[1:])
 
@@ -6,15 +6,19 @@ from greenlet import getcurrent
 class Timeout:
     def __init__(self, seconds):
         self.seconds = seconds
-
-        if seconds and seconds >= 0.000000001:
-          self.towatch = ev.Timer(seconds)
-          self.towatch.branch = getcurrent()
+        self.towatch = None
 
     def __enter__(self):
-        if self.seconds:
-            getcurrent().hub.add_watch(self.towatch, 'tyderium timeout')
+        if self.seconds and self.seconds >= 0.000000001:
+            branch = getcurrent()
+            self.towatch = branch.hub.pool.get(ev.Timer, float(self.seconds))
+            self.towatch.branch = branch
+            branch.hub.add_watch(self.towatch, 'tyderium timeout')
         return self
 
     def __exit__(self, typ, value, tb):
-        pass
+        if self.towatch is not None:
+            hub = getcurrent().hub
+            hub.discard_watch(self.towatch)
+            hub.pool.put(self.towatch)
+            self.towatch = None
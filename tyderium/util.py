@@ -1,7 +1,12 @@
 from . import lib as ev
 
+from greenlet import getcurrent
+
 def sleep(amount=0):
+    pool = getcurrent().hub.pool
     if amount > 0:
-        ev.Timer(float(amount)).start()
+        watch = pool.get(ev.Timer, float(amount))
     else: # use zero value to give other greenlets a chance to run
-        ev.Idle().start()
+        watch = pool.get(ev.Idle)
+    watch.start()
+    pool.put(watch)